@@ -1,7 +1,12 @@
+import json
 import os
 import subprocess
 from pathlib import Path
 
+# Single-pass H.264 settings; a faster preset trades file size for CPU
+TRANSCODE_PRESET = os.environ.get("TRANSCODE_PRESET", "veryfast")
+TRANSCODE_CRF = int(os.environ.get("TRANSCODE_CRF", 23))
+
 def check_ffmpeg():
     """Check if ffmpeg is installed"""
     try:
@@ -11,7 +16,7 @@ def check_ffmpeg():
         return False
 
 def convert_to_xvid(input_file, output_file):
-    """Convert video to XVID format"""
+    """Convert video to XVID format (legacy two-step flow, kept for benchmarking)"""
     command = [
         'ffmpeg',
         '-i', str(input_file),
@@ -31,7 +36,7 @@ def convert_to_xvid(input_file, output_file):
         return False
 
 def convert_to_mp4(input_file, output_file):
-    """Convert XVID video back to MP4 format"""
+    """Convert XVID video back to MP4 format (legacy two-step flow)"""
     command = [
         'ffmpeg',
         '-i', str(input_file),
@@ -50,6 +55,131 @@ def convert_to_mp4(input_file, output_file):
     except Exception:
         return False
 
+def probe_video(input_file):
+    """Container, codecs, pixel format and duration of a video (None if ffprobe fails)"""
+    command = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=format_name,duration:stream=codec_type,codec_name,pix_fmt',
+        '-of', 'json',
+        str(input_file)
+    ]
+
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            return None
+        info = json.loads(result.stdout)
+    except Exception:
+        return None
+
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    return {
+        "format": info.get("format", {}).get("format_name", ""),
+        "duration": float(info.get("format", {}).get("duration") or 0),
+        "video_codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "audio_codec": audio.get("codec_name"),
+    }
+
+def is_browser_playable(info):
+    """H.264/yuv420p video (and AAC audio, if any) in an MP4 container"""
+    return (info is not None
+            and "mp4" in info["format"]
+            and info["video_codec"] == "h264"
+            and info["pix_fmt"] == "yuv420p"
+            and info["audio_codec"] in (None, "aac"))
+
+def remux_to_mp4(input_file, output_file):
+    """Copy the streams into a web-ready MP4 without re-encoding"""
+    command = [
+        'ffmpeg',
+        '-i', str(input_file),
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-y',
+        str(output_file)
+    ]
+
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+def transcode_to_mp4(input_file, output_file, preset=TRANSCODE_PRESET, crf=TRANSCODE_CRF):
+    """Decode once, encode once to H.264/AAC MP4"""
+    command = [
+        'ffmpeg',
+        '-i', str(input_file),
+        '-c:v', 'libx264',
+        '-preset', preset,
+        '-crf', str(crf),
+        '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-movflags', '+faststart',
+        '-y',
+        str(output_file)
+    ]
+
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v'}
+
+def needs_conversion(video_file):
+    """Recorded segments still waiting to become '<name>c.mp4'"""
+    video_file = Path(video_file)
+    return (video_file.suffix.lower() in VIDEO_EXTENSIONS
+            and not video_file.stem.endswith('c')
+            and not video_file.stem.endswith('_temp'))
+
+def convert_segment(video_file):
+    """Convert one recorded segment; returns the output path or None"""
+    video_file = Path(video_file)
+    folder = video_file.parent
+    original_name = video_file.stem
+
+    # Skip if converted version already exists
+    final_mp4_file = folder / f"{original_name}c.mp4"
+    if final_mp4_file.exists():
+        # Delete the original if converted version exists
+        try:
+            video_file.unlink()
+        except Exception:
+            pass
+        return str(final_mp4_file)
+
+    # Single pass into a temp file, renamed once complete so a crash
+    # never leaves a truncated '<name>c.mp4' behind
+    temp_file = folder / f"{original_name}_temp.mp4"
+    if is_browser_playable(probe_video(video_file)):
+        converted = remux_to_mp4(video_file, temp_file)
+    else:
+        converted = transcode_to_mp4(video_file, temp_file)
+
+    if not converted:
+        try:
+            temp_file.unlink()
+        except Exception:
+            pass
+        return None
+
+    os.replace(temp_file, final_mp4_file)
+
+    # Delete original file
+    try:
+        video_file.unlink()
+    except Exception:
+        pass
+
+    return str(final_mp4_file)
+
 def process_videos(folder_path):
     """Process all videos in the folder"""
     
@@ -62,50 +192,12 @@ def process_videos(folder_path):
         folder.mkdir(parents=True, exist_ok=True)
         return
     
-    # Supported video formats
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v'}
-    
     # Get all video files
     video_files = [f for f in folder.iterdir() 
-                   if f.is_file() and f.suffix.lower() in video_extensions]
-    
-    if not video_files:
-        return
+                   if f.is_file() and needs_conversion(f)]
     
     for video_file in video_files:
-        original_name = video_file.stem
-        
-        # Skip if this file is already converted (ends with 'c')
-        if original_name.endswith('c'):
-            continue
-        
-        # Skip if converted version already exists
-        final_mp4_file = folder / f"{original_name}c.mp4"
-        if final_mp4_file.exists():
-            # Delete the original if converted version exists
-            try:
-                video_file.unlink()
-            except Exception:
-                pass
-            continue
-        
-        # Step 1: Convert to XVID
-        xvid_file = folder / f"{original_name}_temp.avi"
-        
-        if convert_to_xvid(video_file, xvid_file):
-            # Delete original file
-            try:
-                video_file.unlink()
-            except Exception:
-                continue
-            
-            # Step 2: Convert back to MP4
-            if convert_to_mp4(xvid_file, final_mp4_file):
-                # Delete XVID temp file
-                try:
-                    xvid_file.unlink()
-                except Exception:
-                    pass
+        convert_segment(video_file)
 
 if __name__ == "__main__":
     # Specify your folder path here
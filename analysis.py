@@ -0,0 +1,161 @@
+import json
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import cv2
+
+from db import (enqueue_analysis_job, claim_analysis_jobs, update_analysis_progress,
+                finish_analysis_job, requeue_stale_analysis_jobs, shutdown_event_writer,
+                TIMESTAMP_FORMAT)
+from recorder import create_recorder
+from evidence import flush_evidence
+import events
+from anpr_engine import reset_anpr_state, finish_ocr
+from ppe_engine import reset_ppe_tracker
+from inference import analyze_frame
+from motion import reset_motion_gate
+
+# ---------------- Offline video analysis ----------------
+# Uploaded videos are analysed once, in a background worker process,
+# instead of once per viewer. Each job writes an annotated video and a
+# JSON Lines detections file (one line per analysed frame) to
+# ANALYSIS_FOLDER; progress is kept in the analysis_jobs table.
+ANALYSIS_FOLDER = os.path.join("static", "analysis")
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", 1))
+ANALYSIS_STRIDE = 1             # analyse every Nth frame
+ANALYSIS_CAMERA_ID = -1         # never a registered camera or the upload ID (0)
+PROGRESS_EVERY = 25             # analysed frames between progress updates
+STALE_JOB_SECONDS = 600         # 'running' jobs with no progress for this long were orphaned
+POLL_SECONDS = 5.0
+ONE_FILE_SECONDS = 24 * 3600    # recorder rotation long enough to keep a job in one file
+
+
+def enqueue_analysis(path, stride=ANALYSIS_STRIDE):
+    return enqueue_analysis_job(os.path.abspath(path), max(1, int(stride)))
+
+
+def _run_analysis(job_id, source, stride):
+    """Worker-process side of a job; returns (output video, detections file) names."""
+    reset_anpr_state(ANALYSIS_CAMERA_ID)
+    reset_ppe_tracker(ANALYSIS_CAMERA_ID)
+    reset_motion_gate(ANALYSIS_CAMERA_ID)
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"cannot open {source}")
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) // stride
+
+    outputs = []
+    recorder = create_recorder(ANALYSIS_FOLDER, fps=max(1, round(source_fps / stride)),
+                               prefix=f"analysis {job_id}", on_segment_closed=outputs.append,
+                               segment_seconds=ONE_FILE_SECONDS)
+    detections_name = f"analysis_{job_id}.jsonl"
+
+    frames_done = 0
+    frame_index = 0
+    try:
+        with open(os.path.join(ANALYSIS_FOLDER, detections_name), "w") as detections:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_index += 1
+                if (frame_index - 1) % stride:
+                    continue
+
+                frame, found = analyze_frame(frame, camera_id=ANALYSIS_CAMERA_ID)
+                recorder.write(frame)
+                found["frame"] = frame_index - 1
+                found["t"] = round((frame_index - 1) / source_fps, 3)
+                detections.write(json.dumps(found) + "\n")
+
+                frames_done += 1
+                if frames_done % PROGRESS_EVERY == 0:
+                    update_analysis_progress(job_id, frames_done, max(frames_total, frames_done))
+
+        # plates read from the last frames are still in the OCR pool
+        finish_ocr(ANALYSIS_CAMERA_ID)
+    finally:
+        cap.release()
+        recorder.release()
+        flush_evidence()
+        shutdown_event_writer()     # flush this job's events before reporting it done
+
+    update_analysis_progress(job_id, frames_done, frames_done)
+    output = os.path.basename(outputs[-1]) if outputs else None
+    return output, detections_name
+
+
+class AnalysisService(threading.Thread):
+    """Claims queued analysis jobs and runs them on a process pool."""
+
+    def __init__(self, workers=ANALYSIS_WORKERS):
+        super().__init__(name="analysis", daemon=True)
+        self.workers = workers
+        self.executor = None
+        self.event_queue = None
+        self.running_jobs = {}      # future -> job id
+        self.wake = threading.Event()
+        self.stopped = False
+
+    def enqueue(self, path, stride=ANALYSIS_STRIDE):
+        job_id = enqueue_analysis(path, stride)
+        self.wake.set()
+        return job_id
+
+    def run(self):
+        os.makedirs(ANALYSIS_FOLDER, exist_ok=True)
+        ctx = mp.get_context("spawn")
+        self.event_queue = ctx.Queue(maxsize=1000)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=ctx,
+            initializer=events.forward_to, initargs=(self.event_queue,)
+        )
+        stale = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+        requeue_stale_analysis_jobs(stale.strftime(TIMESTAMP_FORMAT))
+
+        while not self.stopped:
+            free = self.workers - len(self.running_jobs)
+            if free > 0:
+                for job_id, source, stride in claim_analysis_jobs(free):
+                    try:
+                        future = self.executor.submit(_run_analysis, job_id, source, stride)
+                    except RuntimeError:
+                        return   # interpreter exiting; the job is requeued as stale
+                    self.running_jobs[future] = job_id
+
+            events.drain(self.event_queue)
+            for future in [f for f in self.running_jobs if f.done()]:
+                job_id = self.running_jobs.pop(future)
+                try:
+                    output, detections = future.result()
+                    finish_analysis_job(job_id, output, detections)
+                except Exception as e:
+                    finish_analysis_job(job_id, error=str(e) or type(e).__name__)
+
+            self.wake.wait(1.0 if self.running_jobs else POLL_SECONDS)
+            self.wake.clear()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def start_analysis_service():
+    global _service
+    if mp.parent_process() is not None:
+        return None   # spawned children re-import app.py; only the server runs the service
+    with _service_lock:     # concurrent first requests start one service
+        if _service is None:
+            _service = AnalysisService()
+            _service.start()
+    return _service
@@ -1,119 +1,265 @@
 import cv2
-import os
+import numpy as np
 from collections import Counter
+from concurrent.futures import wait
 
-from models import vehicle_model, plate_model, ocr_plate
-from functions import preprocess_plate, init_buffers
-from db import insert_anpr_event
-
-# ---------------- Image storage paths ----------------
-VEHICLE_DIR = "static/anpr/vehicles"
-PLATE_DIR = "static/anpr/plates"
-os.makedirs(VEHICLE_DIR, exist_ok=True)
-os.makedirs(PLATE_DIR, exist_ok=True)
+from models import get_model
+from ocr_pool import get_ocr_pool
+from detector import track_objects, reset_detector
+from functions import preprocess_plate, letterbox, unletterbox_boxes
+from db import insert_anpr_event, correct_anpr_plate
+from ocr_scheduler import OcrScheduler, from_relative
+from track_store import TrackStore, AnprTrack
+from watchlist import check_plate, get_watchlist_stats
+from evidence import save_evidence
 
 # ---------------- Buffers ----------------
-plate_buffer, final_plate = init_buffers()
 MAX_FRAMES = 5
-saved_tracks = set()
 
-# ---------------- Main Function ----------------
-def run_anpr_on_frame(frame, camera_id=1):
-    results = vehicle_model.track(
+# ---------------- Batched plate detection ----------------
+PLATE_IMGSZ = 640       # every vehicle crop is letterboxed to this size
+PLATE_MAX_BATCH = 16    # crops per plate_model forward pass
+
+class AnprState:
+    """Per-track buffers of one camera."""
+
+    def __init__(self):
+        self.tracks = TrackStore(AnprTrack)
+        self.scheduler = OcrScheduler()
+
+_camera_states = {}
+
+def get_anpr_state(camera_id):
+    if camera_id not in _camera_states:
+        _camera_states[camera_id] = AnprState()
+    return _camera_states[camera_id]
+
+def reset_anpr_state(camera_id):
+    _camera_states.pop(camera_id, None)
+    reset_detector(camera_id)
+
+def detect_plates(vehicle_crops):
+    """
+    Runs plate detection over all vehicle crops of a frame in
+    batched forward passes. Returns one array of xyxy plate boxes
+    (in crop coordinates) per crop.
+    """
+    plate_boxes = [np.zeros((0, 4), dtype=np.float32) for _ in vehicle_crops]
+
+    batch = []
+    for i, crop in enumerate(vehicle_crops):
+        if crop.size == 0:
+            continue
+        img, scale, pad = letterbox(crop, PLATE_IMGSZ)
+        batch.append((i, img, scale, pad))
+
+    plate_model = get_model("plate")
+    for start in range(0, len(batch), PLATE_MAX_BATCH):
+        chunk = batch[start:start + PLATE_MAX_BATCH]
+        results = plate_model.predict(
+            [img for _, img, _, _ in chunk],
+            imgsz=PLATE_IMGSZ, conf=0.4, verbose=False
+        )
+
+        for (i, _, scale, pad), res in zip(chunk, results):
+            if res.boxes is None or len(res.boxes) == 0:
+                continue
+            plate_boxes[i] = unletterbox_boxes(
+                res.boxes.xyxy.cpu().numpy(), scale, pad, vehicle_crops[i].shape
+            )
+
+    return plate_boxes
+
+def draw_plate(frame, x1, y1, plate_box, text, color=(0, 255, 0)):
+    px1, py1, px2, py2 = plate_box
+
+    cv2.rectangle(
+        frame,
+        (x1 + px1, y1 + py1),
+        (x1 + px2, y1 + py2),
+        color, 2
+    )
+
+    cv2.putText(
         frame,
-        conf=0.4,
-        classes=[2, 3, 5, 7],  # car, motorcycle, bus, truck
-        persist=True,
-        verbose=False
+        text,
+        (x1 + px1, y1 + py1 - 10),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.6,
+        color,
+        2
     )
 
-    if results and results[0].boxes is not None and results[0].boxes.id is not None:
-        boxes = results[0].boxes.xyxy.cpu().numpy()
-        ids = results[0].boxes.id.cpu().numpy()
+def draw_vehicle(frame, x1, y1, x2, y2, vid):
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+    cv2.putText(
+        frame, f"ID {vid}", (x1, y1 - 10),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2
+    )
 
-        for box, track_id in zip(boxes, ids):
-            x1, y1, x2, y2 = map(int, box)
-            vid = int(track_id)
+def plate_label(track):
+    """Display text and color for a track's plate; watchlist hits in red."""
+    if track.plate is None:
+        return "Detecting...", (0, 255, 0)
+    if track.watch_hit is not None:
+        return f"{track.plate} [WATCHLIST]", (0, 0, 255)
+    return track.plate, (0, 255, 0)
 
-            vehicle_crop = frame[y1:y2, x1:x2]
+# ---------------- Buffer Logic ----------------
+def apply_plate_read(state, camera_id, vid, raw_text, plate_box, vehicle_crop, plate_crop):
+    """Feeds one finished OCR read of track `vid` into its track record."""
+    clean_text = preprocess_plate(raw_text)
 
-            # ---------------- Draw vehicle box ----------------
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            cv2.putText(
-                frame, f"ID {vid}", (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2
-            )
+    # 🚨 IMPORTANT FIX:
+    # If text is invalid (<8 chars or fails rules),
+    # treat it as NOT A NUMBER PLATE
+    if clean_text is None:
+        return
+
+    track = state.tracks.touch(vid)
+
+    if track.plate is not None:
+        # Re-reads from a clearly better crop replace the frozen plate
+        # only when two of them agree; one stray read changes nothing
+        if clean_text == track.plate:
+            track.reread = None
+        elif clean_text != track.reread:
+            track.reread = clean_text
+            return
+        else:
+            previous, track.plate, track.reread = track.plate, clean_text, None
+            track.watch_hit = check_plate(track.plate, vid, camera_id, previous=track.watch_hit)
+            if track.vehicle_image is not None:
+                correct_anpr_plate(vid, camera_id, track.vehicle_image, previous, track.plate)
+        state.scheduler.resolve(track, plate_box, vehicle_crop, plate_crop)
+        return
+
+    track.reads.append(clean_text)
 
-            # ---------------- Plate detection ----------------
-            plate_results = plate_model.predict(
-                vehicle_crop, conf=0.4, verbose=False
+    # Freeze plate after MAX_FRAMES OR single-frame case
+    if (
+        len(track.reads) >= MAX_FRAMES
+        or (len(track.reads) == 1 and track.vehicle_image is None)
+    ):
+        track.plate = Counter(track.reads).most_common(1)[0][0]
+        track.reads = []
+        state.scheduler.resolve(track, plate_box, vehicle_crop, plate_crop)
+        track.watch_hit = check_plate(track.plate, vid, camera_id)
+
+        if track.vehicle_image is None:
+            # written in the background; the paths are known right away
+            track.vehicle_image = save_evidence("vehicles", camera_id, vehicle_crop)
+            plate_path = save_evidence("plates", camera_id, plate_crop)
+
+            insert_anpr_event(
+                track_id=vid,
+                plate_number=track.plate,
+                vehicle_image=track.vehicle_image,
+                plate_image=plate_path,
+                camera_id=camera_id
             )
 
-            if plate_results[0].boxes is None:
-                continue
+def collect_ocr_results(state, camera_id):
+    for vid, raw_text, (plate_box, vehicle_crop, plate_crop) in get_ocr_pool().collect(camera_id):
+        apply_plate_read(state, camera_id, vid, raw_text, plate_box, vehicle_crop, plate_crop)
+
+def finish_ocr(camera_id, timeout=None):
+    """Waits for the reads still in flight and applies them (end of an offline video)."""
+    get_ocr_pool().wait_pending(camera_id, timeout)
+    collect_ocr_results(get_anpr_state(camera_id), camera_id)
+
+# ---------------- Main Function ----------------
+def run_anpr_on_frame(frame, camera_id=1, vehicles=None, wait_ocr=False):
+    """
+    `vehicles`: tracked (x1, y1, x2, y2, id) boxes from detector.track_objects.
+    OCR runs in the background pool; with `wait_ocr` (single images)
+    the reads are awaited so the returned frame shows them.
+    """
+    state = get_anpr_state(camera_id)
+    scheduler = state.scheduler
+    ocr_pool = get_ocr_pool()
+
+    state.tracks.tick()
+
+    # Reads that finished since the last frame
+    collect_ocr_results(state, camera_id)
+
+    if vehicles is None:
+        vehicles = track_objects(frame, camera_id).vehicles
+
+    if not vehicles:
+        return frame
+
+    vehicle_crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2, _ in vehicles]
+    tracks = [state.tracks.touch(vid) for _, _, _, _, vid in vehicles]
+
+    # Resolved tracks skip plate detection and OCR unless the crop improved
+    needs_ocr = [
+        crop.size > 0 and scheduler.needs_ocr(track, crop)
+        for track, crop in zip(tracks, vehicle_crops)
+    ]
+
+    # ---------------- Plate detection (one batch per frame) ----------------
+    detected = detect_plates([
+        crop for crop, wanted in zip(vehicle_crops, needs_ocr) if wanted
+    ])
+    detected = iter(detected)
+
+    for (x1, y1, x2, y2, vid), track, vehicle_crop, wanted in zip(
+        vehicles, tracks, vehicle_crops, needs_ocr
+    ):
+        # ---------------- Draw vehicle box ----------------
+        draw_vehicle(frame, x1, y1, x2, y2, vid)
+
+        if not wanted:
+            if track.plate is not None:
+                text, color = plate_label(track)
+                draw_plate(frame, x1, y1, scheduler.carried_box(track, vehicle_crop), text, color)
+            continue
+
+        for pbox in next(detected):
+            px1, py1, px2, py2 = map(int, pbox)
+            plate_crop = vehicle_crop[py1:py2, px1:px2]
+
+            # ---------------- Submit OCR (one job per track) ----------------
+            key = (camera_id, vid)
+            if not ocr_pool.is_pending(key) and plate_crop.size > 0:
+                # copies: the frame is drawn on before the read comes back
+                context = ((px1, py1, px2, py2), vehicle_crop.copy(), plate_crop.copy())
+                future = ocr_pool.submit(key, context[2], context)
+                scheduler.ocr_calls += 1
+
+                if wait_ocr and future is not None:
+                    wait([future])      # a failed read is counted by collect, not raised here
+                    collect_ocr_results(state, camera_id)
+
+            # ---------------- Display Text ----------------
+            display_text, color = plate_label(track)
+
+            # ---------------- Draw plate box ----------------
+            draw_plate(frame, x1, y1, (px1, py1, px2, py2), display_text, color)
+
+    return frame
+
+def draw_carried_vehicles(frame, camera_id, vehicles):
+    """
+    Redraws carried-forward vehicle boxes and their known plates on a
+    frame the motion gate skipped; no detection or OCR runs.
+    """
+    state = get_anpr_state(camera_id)
+    for x1, y1, x2, y2, vid in vehicles:
+        draw_vehicle(frame, x1, y1, x2, y2, vid)
+
+        track = state.tracks.get(vid)
+        if track is not None and track.plate is not None and track.plate_box is not None:
+            text, color = plate_label(track)
+            draw_plate(frame, x1, y1, from_relative(track.plate_box, x2 - x1, y2 - y1), text, color)
+    return frame
 
-            for pbox in plate_results[0].boxes.xyxy.cpu().numpy():
-                px1, py1, px2, py2 = map(int, pbox)
-                plate_crop = vehicle_crop[py1:py2, px1:px2]
-
-                raw_text = ocr_plate(plate_crop)
-                clean_text = preprocess_plate(raw_text)
-
-                # 🚨 IMPORTANT FIX:
-                # If text is invalid (<8 chars or fails rules),
-                # treat it as NOT A NUMBER PLATE
-                if clean_text is None:
-                    continue
-
-                # ---------------- Buffer Logic ----------------
-                if vid not in final_plate:
-                    plate_buffer[vid].append(clean_text)
-
-                    # Freeze plate after MAX_FRAMES OR single-frame case
-                    if (
-                        len(plate_buffer[vid]) >= MAX_FRAMES
-                        or (len(plate_buffer[vid]) == 1 and vid not in saved_tracks)
-                    ):
-                        final_plate[vid] = Counter(
-                            plate_buffer[vid]
-                        ).most_common(1)[0][0]
-
-                        if vid not in saved_tracks:
-                            vehicle_path = f"{VEHICLE_DIR}/vehicle_{vid}.jpg"
-                            plate_path = f"{PLATE_DIR}/plate_{vid}.jpg"
-
-                            cv2.imwrite(vehicle_path, vehicle_crop)
-                            cv2.imwrite(plate_path, plate_crop)
-
-                            insert_anpr_event(
-                                track_id=vid,
-                                plate_number=final_plate[vid],
-                                vehicle_image=vehicle_path,
-                                plate_image=plate_path,
-                                camera_id=camera_id
-                            )
-
-                            saved_tracks.add(vid)
-
-                # ---------------- Display Text ----------------
-                display_text = final_plate[vid] if vid in final_plate else "Detecting..."
-
-                # ---------------- Draw plate box ----------------
-                cv2.rectangle(
-                    frame,
-                    (x1 + px1, y1 + py1),
-                    (x1 + px2, y1 + py2),
-                    (0, 255, 0), 2
-                )
-
-                cv2.putText(
-                    frame,
-                    display_text,
-                    (x1 + px1, y1 + py1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6,
-                    (0, 255, 0),
-                    2
-                )
-
-    return frame
\ No newline at end of file
+def get_anpr_stats(camera_id):
+    state = get_anpr_state(camera_id)
+    stats = state.scheduler.stats()
+    stats.update(state.tracks.stats())
+    stats.update(get_ocr_pool().stats())
+    stats.update(get_watchlist_stats())
+    return stats
@@ -1,16 +1,29 @@
 import os
+import re
 import time
+import uuid
 from datetime import datetime
 from flask import Flask, render_template, Response, request, redirect, session, jsonify , send_from_directory ,url_for
 import cv2
-
-from anpr_engine import run_anpr_on_frame
-from ppe_engine import run_ppe_on_frame
-from db import init_databases, get_all_anpr_events, get_all_ppe_violations, verify_user
-from Videoconverter import process_videos
+from werkzeug.security import safe_join
+
+from inference import process_frame, engine_stats
+from db import (init_databases, query_anpr_events, query_ppe_violations, verify_user,
+                add_watchlist_plate, remove_watchlist_plate, get_watchlist, get_watchlist_alerts,
+                get_transcode_jobs, get_analysis_job)
+from transcoder import start_transcode_service, read_manifest
+from analysis import start_analysis_service, ANALYSIS_STRIDE, ANALYSIS_CAMERA_ID
+from camera import get_worker, CAMERAS, DEFAULT_CAMERA_ID
+from plate_search import search_plate_history, SEARCH_MODES
+from hls import build_playlist, RECORDING_IDLE_SECONDS
+from frame_encoder import PROFILES, DEFAULT_PROFILE
+from events import sse_stream
+from evidence import thumbnail_path
+from models import model_status
 
 app = Flask(__name__)
 app.secret_key = "anpr_secret_key"
+app.jinja_env.filters['thumb'] = thumbnail_path
 
 UPLOAD_FOLDER = "static/uploads"
 LIVE_FEED_FOLDER = os.path.join("static", "Live Feed")
@@ -23,12 +36,42 @@ os.makedirs(LIVE_FEED_FOLDER, exist_ok=True)
 # Initialize databases on startup
 init_databases()
 
+
+# Uploaded images/videos get their own tracker state, separate from live cameras
+UPLOAD_CAMERA_ID = 0
+
+# ---------------- Background services ----------------
+# Segment conversion and video analysis start with the first request,
+# not at import: under app.run(debug=True) the reloader's watcher
+# process imports this module too, but never serves, and must not
+# claim jobs or run pools of its own.
+_services_started = False
+
+@app.before_request
+def start_background_services():
+    global _services_started
+    if not _services_started:
+        start_transcode_service()
+        start_analysis_service()
+        _services_started = True
+
 # ---------------- Stream Control ----------------
-stream_running = False
+# Pause is kept per viewer and camera: pausing freezes only this
+# viewer's feed of that camera, while everyone else sharing the camera
+# worker keeps getting live frames. Viewers are told apart by an id
+# stored in their session.
+paused_views = set()            # (viewer, camera_id)
+
+
+def viewer_id():
+    if 'viewer' not in session:
+        session['viewer'] = uuid.uuid4().hex
+    return session['viewer']
 
-last_processed_frame = None     # latest processed frame
-paused_frame = None             # frozen frame for pause
-view_mode = "live"              # live | paused | resume
+
+def requested_camera_id():
+    camera_id = request.args.get('camera_id', DEFAULT_CAMERA_ID, type=int)
+    return camera_id if camera_id in CAMERAS else DEFAULT_CAMERA_ID
 
 # ---------------- Login ----------------
 @app.route('/', methods=['GET', 'POST'])
@@ -55,98 +98,203 @@ def dashboard():
 
 
 # ---------------- Violations Page ----------------
+def parse_cursor(value):
+    """Keyset cursor "timestamp|id" from the query string."""
+    if not value or "|" not in value:
+        return None
+    timestamp, row_id = value.rsplit("|", 1)
+    return (timestamp, int(row_id)) if row_id.isdigit() else None
+
+
 @app.route('/violations')
 def violations():
     if 'user' not in session:
         return redirect('/')
 
-    anpr_data = get_all_anpr_events()
-    ppe_data = get_all_ppe_violations()
+    filters = {
+        "date_from": request.args.get('date_from', ''),
+        "date_to": request.args.get('date_to', ''),
+        "camera_id": request.args.get('camera_id', ''),
+        "plate": request.args.get('plate', ''),
+    }
+    start = f"{filters['date_from']} 00:00:00" if filters['date_from'] else None
+    end = f"{filters['date_to']} 23:59:59" if filters['date_to'] else None
+    try:
+        camera_id = int(filters['camera_id'])     # may be negative: ANALYSIS_CAMERA_ID
+    except ValueError:
+        camera_id = None
+
+    anpr_data, anpr_next = query_anpr_events(
+        start, end, camera_id, filters['plate'],
+        before=parse_cursor(request.args.get('anpr_before'))
+    )
+    ppe_data, ppe_next = query_ppe_violations(
+        start, end, camera_id,
+        before=parse_cursor(request.args.get('ppe_before'))
+    )
 
+    active = {k: v for k, v in filters.items() if v}
     return render_template(
         "violations.html",
         anpr_events=anpr_data,
-        ppe_events=ppe_data
+        ppe_events=ppe_data,
+        filters=filters,
+        cameras=list(CAMERAS.values()) + [
+            {"camera_id": UPLOAD_CAMERA_ID, "name": "Image uploads"},
+            {"camera_id": ANALYSIS_CAMERA_ID, "name": "Video analysis"},
+        ],
+        anpr_next_url=url_for('violations', anpr_before=f"{anpr_next[0]}|{anpr_next[1]}", **active)
+        if anpr_next else None,
+        ppe_next_url=url_for('violations', ppe_before=f"{ppe_next[0]}|{ppe_next[1]}", **active)
+        if ppe_next else None,
     )
 
-# ---------------- Camera Stream + Recording ----------------
-def gen_frames():
-    global stream_running, last_processed_frame, paused_frame, view_mode
-
-    cap = cv2.VideoCapture(0)
-    stream_running = True
+# ---------------- Vehicle Watchlist ----------------
+def clean_plate_arg(value):
+    return re.sub(r'[^A-Z0-9]', '', (value or '').upper())
 
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    fps = 5
-    frame_interval = 1.0 / fps
-    last_frame_time = time.time()
-
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    start_time = time.time()
-
-    def new_writer():
-        timestamp = datetime.now().strftime('%d.%m.%Y - %H.%M.%S')
-        filename = f"live {timestamp}.mp4"
-        path = os.path.join(LIVE_FEED_FOLDER, filename)
-        return cv2.VideoWriter(path, fourcc, fps, (width, height))
-
-    out = new_writer()
+@app.route('/watchlist', methods=['GET', 'POST'])
+def watchlist():
+    if 'user' not in session:
+        return redirect('/')
 
-    while stream_running:
-        success, frame = cap.read()
-        if not success:
-            break
+    if request.method == 'POST':
+        plate = clean_plate_arg(request.form.get('plate_number'))
+        if not plate:
+            return jsonify({"error": "plate_number is required"}), 400
+        add_watchlist_plate(plate, request.form.get('reason', ''))
+        return jsonify({"status": "added", "plate_number": plate})
 
-        # Rotate recording every 3 minutes
-        if time.time() - start_time >= 180:
-            out.release()
-            out = new_writer()
-            start_time = time.time()
+    rows, _ = get_watchlist()
+    return jsonify([
+        {"plate_number": plate, "reason": reason, "added_at": added_at}
+        for plate, reason, added_at in rows
+    ])
 
-        # -------- ALWAYS PROCESS --------
-        processed = run_anpr_on_frame(frame, camera_id=1)
-        processed = run_ppe_on_frame(processed, camera_id=1)
 
-        # -------- ALWAYS SAVE --------
-        out.write(processed)
+@app.route('/watchlist/<plate>', methods=['DELETE'])
+def watchlist_remove(plate):
+    if 'user' not in session:
+        return redirect('/')
+    remove_watchlist_plate(clean_plate_arg(plate))
+    return jsonify({"status": "removed"})
 
-        last_processed_frame = processed
 
-        # -------- UI STATE MACHINE --------
-        if view_mode == "paused":
-            if paused_frame is None:
-                paused_frame = last_processed_frame.copy()
-            display_frame = paused_frame
+@app.route('/watchlist/alerts')
+def watchlist_alerts():
+    if 'user' not in session:
+        return redirect('/')
+    keys = ("id", "plate_number", "watch_plate", "match_type", "distance",
+            "track_id", "camera_id", "timestamp")
+    return jsonify([dict(zip(keys, row)) for row in get_watchlist_alerts()])
 
-        elif view_mode == "resume":
-            
-            paused_frame = None
-            display_frame = last_processed_frame
-            view_mode = "resume"  
+# ---------------- Plate History Search ----------------
+@app.route('/api/plates/search')
+def plate_search():
+    if 'user' not in session:
+        return jsonify({"error": "login required"}), 401
+
+    mode = request.args.get('mode', 'substring')
+    if mode not in SEARCH_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(SEARCH_MODES)}"}), 400
+
+    plates, events, next_cursor = search_plate_history(
+        request.args.get('q', ''),
+        mode=mode,
+        max_distance=max(0, min(request.args.get('distance', 1, type=int), 2)),
+        before=parse_cursor(request.args.get('before')),
+        limit=max(1, min(request.args.get('limit', 50, type=int), 500)),
+    )
 
-        else:  
-            paused_frame = None
-            display_frame = last_processed_frame
-        # --------------------------------
+    return jsonify({
+        "plates": [
+            {"plate_number": p, "first_seen": first, "last_seen": last,
+             "sightings": count, "distance": distance}
+            for p, first, last, count, distance in plates
+        ],
+        "events": [
+            {"id": row[0], "track_id": row[1], "plate_number": row[2],
+             "vehicle_image": row[3], "plate_image": row[4],
+             "timestamp": row[5], "camera_id": row[6]}
+            for row in events
+        ],
+        "next": f"{next_cursor[0]}|{next_cursor[1]}" if next_cursor else None,
+    })
 
-        ret, buffer = cv2.imencode('.jpg', display_frame)
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+# ---------------- Camera Stream + Recording ----------------
+def gen_frames(camera_id, profile=DEFAULT_PROFILE, viewer=None):
+    worker = get_worker(camera_id, process_frame, engine_stats)
+    worker.start()
+
+    # chunks arrive fully encoded and framed; every viewer gets the same bytes
+    view = (viewer, camera_id)
+    paused_frame = None
+    try:
+        for chunk in worker.subscribe(profile):
+            # -------- UI STATE MACHINE --------
+            if view in paused_views:
+                if paused_frame is None:
+                    paused_frame = chunk
+                chunk = paused_frame
+            else:
+                paused_frame = None
+            # --------------------------------
+
+            yield chunk
+    finally:
+        paused_views.discard(view)
+
+
+@app.route('/cameras')
+def cameras():
+    if 'user' not in session:
+        return redirect('/')
+    return jsonify([
+        {"camera_id": cam["camera_id"], "name": cam["name"]}
+        for cam in CAMERAS.values()
+    ])
 
-        # FPS enforcement
-        now = time.time()
-        elapsed = now - last_frame_time
-        if elapsed < frame_interval:
-            time.sleep(frame_interval - elapsed)
-        last_frame_time = time.time()
 
-    cap.release()
-    out.release()
-    stream_running = False
+@app.route('/events/stream')
+def event_stream():
+    """Server-sent ANPR / PPE / watchlist events; resumes from Last-Event-ID."""
+    if 'user' not in session:
+        return redirect('/')
+    last_seq = request.headers.get('Last-Event-ID', type=int)
+    response = Response(sse_stream(last_seq), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'     # let nginx pass events through unbuffered
+    return response
 
 
+@app.route('/stream_stats')
+def stream_stats():
+    if 'user' not in session:
+        return redirect('/')
+    return jsonify([get_worker(camera_id, process_frame, engine_stats).stats() for camera_id in CAMERAS])
+
+
+@app.route('/ready')
+def ready():
+    """
+    Readiness probe: 200 once every running camera process has loaded
+    and warmed up its models and OCR workers, 503 while any is still
+    loading. Models of this process (image uploads) load on first use
+    and are listed too. Per-model details need a login.
+    """
+    cameras = {}
+    for camera_id in CAMERAS:
+        stats = get_worker(camera_id, process_frame, engine_stats).stats()
+        if stats["running"]:
+            cameras[camera_id] = stats["stages"].get("models", {"ready": False, "models": {}})
+
+    web = model_status()
+    is_ready = web["ready"] and all(status["ready"] for status in cameras.values())
+    status = 200 if is_ready else 503
+    if 'user' not in session:
+        return jsonify({"ready": is_ready}), status
+    return jsonify({"ready": is_ready, "web": web, "cameras": cameras}), status
 
 
 @app.route('/video_feed')
@@ -154,7 +302,11 @@ def gen_frames():
 def video_feed():
     if 'user' not in session:
         return redirect('/')
-    return Response(gen_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    profile = request.args.get('profile', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        profile = DEFAULT_PROFILE
+    return Response(gen_frames(requested_camera_id(), profile, viewer_id()),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 # ---------------- self changed ----------------
 
@@ -165,47 +317,78 @@ def videos():
     if 'user' not in session:
         return redirect('/')
     
-    process_videos(VIDEO_FOLDER)
-    
-    video_files = []
-    if os.path.exists(VIDEO_FOLDER):
-        for filename in os.listdir(VIDEO_FOLDER):
-            if filename.lower().endswith('c.mp4'):
-                video_files.append(filename)    
-    return render_template('videos.html', videos=video_files)
+    return render_template('videos.html', videos=read_manifest())
+
+
+@app.route('/transcode_jobs')
+def transcode_jobs():
+    if 'user' not in session:
+        return redirect('/')
+    keys = ("id", "source", "output", "status", "attempts", "error", "created_at", "updated_at")
+    return jsonify([dict(zip(keys, row)) for row in get_transcode_jobs()])
+
+# Finished recordings never change, so browsers may cache them; files
+# still being written (and the manifest) are revalidated every time.
+RECORDING_MAX_AGE = 24 * 3600
 
 @app.route('/static/Live Feed/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
+    path = safe_join(app.root_path, VIDEO_FOLDER, filename)
+    try:
+        finished = time.time() - os.path.getmtime(path) > RECORDING_IDLE_SECONDS
+    except (OSError, TypeError):
+        finished = False
+
+    # conditional=True answers Range and If-None-Match/If-Modified-Since
+    # requests with 206/304, so seeking only fetches the bytes it needs
+    response = send_from_directory(VIDEO_FOLDER, filename, conditional=True, etag=True,
+                                   max_age=RECORDING_MAX_AGE if finished else 0)
+    if not finished:
+        response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/hls/cam<int:camera_id>.m3u8')
+def camera_playlist(camera_id):
+    """HLS playlist over a camera's recordings, optionally ?date=YYYY-MM-DD."""
+    if 'user' not in session:
+        return redirect('/')
+
+    day = None
+    if request.args.get('date'):
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+
+    response = Response(build_playlist(camera_id, day), mimetype='application/vnd.apple.mpegurl')
+    response.cache_control.no_cache = True
+    return response
 
 
 
 # ---------------- Stream Controls ----------------
 @app.route('/pause')
 def pause_stream():
-    global view_mode
-    view_mode = "paused"
+    paused_views.add((viewer_id(), requested_camera_id()))
     return jsonify({"status": "paused"})
 
 
 @app.route('/play')
 def play_stream():
-    global view_mode
-    view_mode = "resume"
+    paused_views.discard((viewer_id(), requested_camera_id()))
     return jsonify({"status": "resumed"})
 
 
 @app.route('/live')
 def live_stream():
-    global view_mode
-    view_mode = "live"
+    paused_views.discard((viewer_id(), requested_camera_id()))
     return jsonify({"status": "live"})
 
 
 @app.route('/stop')
 def stop_stream():
-    global stream_running
-    stream_running = False
+    get_worker(requested_camera_id(), process_frame, engine_stats).stop()
     return jsonify({"status": "stopped"})
 
 
@@ -221,8 +404,7 @@ def upload_image():
 
     img = cv2.imread(path)
 
-    img = run_anpr_on_frame(img, camera_id=1)
-    img = run_ppe_on_frame(img, camera_id=1)
+    img = process_frame(img, camera_id=UPLOAD_CAMERA_ID, wait_ocr=True)
 
     out_path = os.path.join(UPLOAD_FOLDER, "out_" + file.filename)
     cv2.imwrite(out_path, img)
@@ -231,24 +413,8 @@ def upload_image():
 
 
 # ---------------- Video Upload ----------------
-def gen_video(path):
-    cap = cv2.VideoCapture(path)
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame = run_anpr_on_frame(frame, camera_id=1)
-        frame = run_ppe_on_frame(frame, camera_id=1)
-
-        _, buffer = cv2.imencode('.jpg', frame)
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-    cap.release()
-
-
+# Uploaded videos are analysed once in the background; viewers replay
+# the stored result instead of re-running the pipeline.
 @app.route('/upload_video', methods=['POST'])
 def upload_video():
     if 'user' not in session:
@@ -257,15 +423,26 @@ def upload_video():
     file = request.files['file']
     path = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(path)
-    return render_template("dashboard.html", video=file.filename)
 
+    stride = request.form.get('stride', ANALYSIS_STRIDE, type=int)
+    job_id = start_analysis_service().enqueue(path, stride)
+    return render_template("dashboard.html", analysis_job=job_id)
 
-@app.route('/video_stream/<filename>')
-def video_stream(filename):
+
+@app.route('/analysis/<int:job_id>')
+def analysis_status(job_id):
     if 'user' not in session:
         return redirect('/')
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    return Response(gen_video(path), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    job = get_analysis_job(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+
+    job["progress"] = round(job["frames_done"] / job["frames_total"], 3) if job["frames_total"] else 0.0
+    for key in ("output", "detections"):
+        if job[key]:
+            job[key + "_url"] = url_for('static', filename=f"analysis/{job[key]}")
+    return jsonify(job)
 
 
 # ---------------- Run ----------------
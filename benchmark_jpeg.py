@@ -0,0 +1,91 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import frame_encoder
+from frame_encoder import PROFILES, encode_profiles
+
+# ---------------- JPEG encode benchmark ----------------
+# Encode CPU per viewer per frame for the old per-viewer path
+# (imencode at default quality + tobytes + concatenation for every
+# client) against the encode-once cache, for each encoder backend.
+
+
+def per_viewer_encode(frame, viewers):
+    for _ in range(viewers):
+        _, buffer = cv2.imencode('.jpg', frame)
+        chunk = (b'--frame\r\n'
+                 b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+    return chunk
+
+
+def encode_once(frame, viewers, profiles):
+    chunks = encode_profiles(frame, profiles)
+    for _ in range(viewers):
+        chunk = chunks[profiles[0]]     # what every viewer of that profile is sent
+    return chunk
+
+
+def cpu_ms(fn, frames, *args):
+    start = time.process_time()
+    for frame in frames:
+        fn(frame, *args)
+    return 1000 * (time.process_time() - start) / len(frames)
+
+
+def load_frames(video, count, size):
+    if video:
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+
+    # synthetic stand-in: smooth gradient plus noise, closer to camera
+    # footage than pure noise
+    width, height = size
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    base = cv2.cvtColor(gradient, cv2.COLOR_GRAY2BGR)
+    rng = np.random.default_rng(0)
+    return [cv2.add(base, rng.integers(0, 20, base.shape, dtype=np.uint8)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark live-stream JPEG encoding")
+    parser.add_argument("--video", help="sample footage (default: synthetic 1280x720 frames)")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames, (1280, 720))
+    backends = ["opencv"]
+    if frame_encoder._turbo is not None:
+        backends.insert(0, "turbojpeg")
+
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"{'path':<28} {'viewers':>7} {'cpu ms/frame':>13} {'per viewer':>11}")
+    for viewers in args.viewers:
+        total = cpu_ms(per_viewer_encode, frames, viewers)
+        print(f"{'per-viewer imencode':<28} {viewers:>7} {total:>13.2f} {total / viewers:>11.2f}")
+
+        turbo = frame_encoder._turbo
+        for backend in backends:
+            frame_encoder._turbo = turbo if backend == "turbojpeg" else None
+            for profiles in (["full"], ["full", "thumb"]):
+                total = cpu_ms(encode_once, frames, viewers, profiles)
+                label = f"once {backend} {'+'.join(profiles)}"
+                print(f"{label:<28} {viewers:>7} {total:>13.2f} {total / viewers:>11.2f}")
+        frame_encoder._turbo = turbo
+
+    print("profiles:", {name: p for name, p in PROFILES.items()})
+
+
+if __name__ == "__main__":
+    main()
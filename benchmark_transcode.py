@@ -0,0 +1,89 @@
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from Videoconverter import (check_ffmpeg, probe_video, convert_to_xvid, convert_to_mp4,
+                            transcode_to_mp4, remux_to_mp4, is_browser_playable,
+                            TRANSCODE_PRESET, TRANSCODE_CRF)
+
+# ---------------- Transcode benchmark ----------------
+# Compares the legacy XVID round trip with the single-pass transcode
+# (and remux, where the source allows it) on recorded segments.
+# Reports wall time and ffmpeg CPU-seconds per recorded minute.
+
+
+def two_step(input_file, output_file):
+    xvid_file = Path(output_file).with_suffix(".avi")
+    ok = convert_to_xvid(input_file, xvid_file) and convert_to_mp4(xvid_file, output_file)
+    if xvid_file.exists():
+        xvid_file.unlink()
+    return ok
+
+
+def measure(convert, input_file, output_file):
+    """Returns (ok, wall seconds, CPU seconds of the ffmpeg children)."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    ok = convert(input_file, output_file)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return ok, wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark segment conversion flows")
+    parser.add_argument("videos", nargs="+", help="recorded segments to convert (left untouched)")
+    parser.add_argument("--preset", default=TRANSCODE_PRESET)
+    parser.add_argument("--crf", type=int, default=TRANSCODE_CRF)
+    args = parser.parse_args()
+
+    if not check_ffmpeg():
+        raise SystemExit("ffmpeg not found")
+
+    flows = {
+        "two-step": two_step,
+        "single-pass": lambda i, o: transcode_to_mp4(i, o, args.preset, args.crf),
+    }
+    totals = {name: [0.0, 0.0, 0, 0.0] for name in list(flows) + ["remux"]}   # wall, cpu, bytes, minutes
+
+    workdir = tempfile.mkdtemp(prefix="transcode_bench_")
+    try:
+        for video in args.videos:
+            info = probe_video(video)
+            if info is None or not info["duration"]:
+                print(f"skipping {video}: ffprobe failed")
+                continue
+
+            runs = dict(flows)
+            if is_browser_playable(info):
+                runs["remux"] = remux_to_mp4
+
+            for name, convert in runs.items():
+                output = os.path.join(workdir, f"{name}.mp4")
+                ok, wall, cpu = measure(convert, video, output)
+                if not ok:
+                    print(f"{name} failed on {video}")
+                    continue
+                totals[name][0] += wall
+                totals[name][1] += cpu
+                totals[name][2] += os.path.getsize(output)
+                totals[name][3] += info["duration"] / 60
+                os.remove(output)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"preset={args.preset} crf={args.crf}")
+    print(f"{'flow':<12} {'minutes':>8} {'wall s/min':>11} {'cpu s/min':>10} {'MB/min':>8}")
+    for name, (wall, cpu, size, minutes) in totals.items():
+        if minutes:
+            print(f"{name:<12} {minutes:>8.1f} {wall / minutes:>11.2f} {cpu / minutes:>10.2f} "
+                  f"{size / minutes / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
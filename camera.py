@@ -1 +1,316 @@
-print("this is a camera feature")
\ No newline at end of file
+import atexit
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from functools import partial
+
+import cv2
+
+from pipeline import LivePipeline
+from recorder import create_recorder, LIVE_FEED_FOLDER
+from db import shutdown_event_writer
+from evidence import flush_evidence
+import events
+from frame_encoder import encode_profiles, profiles_in_mask, profile_bit, DEFAULT_PROFILE
+from transcoder import segment_closed
+from models import start_model_warmup
+
+
+# ---------------- Broadcast hub ----------------
+class FrameHub:
+    """
+    Holds the latest encoded frame of one camera ({profile: multipart
+    chunk}) and wakes every subscriber when a new one is published. Subscribers only ever
+    see the newest frame, so a slow client skips frames instead of
+    queueing them.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._closed = False
+        self.subscribers = 0
+
+    def publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def subscribe(self, timeout=1.0):
+        """Yields each new frame until the hub is closed."""
+        with self._cond:
+            self.subscribers += 1
+            seen = self._seq
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != seen or self._closed, timeout)
+                    if self._closed:
+                        return
+                    if self._seq == seen:
+                        continue
+                    seen = self._seq
+                    frame = self._frame
+                yield frame
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+# ---------------- Camera registry ----------------
+CAMERAS_FILE = os.environ.get("CAMERAS_FILE", "cameras.json")
+
+DEFAULT_CAMERAS = [
+    {"camera_id": 1, "name": "Camera 1", "source": 0, "fps": 5},
+]
+
+
+def _parse_source(source):
+    """Device indexes may be given as strings in the config file."""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def is_live_source(source):
+    """Device indexes and network streams are live; anything else is a file."""
+    return isinstance(source, int) or "://" in source
+
+
+def load_camera_registry(path=CAMERAS_FILE):
+    """
+    Reads the camera list from `path` (a JSON list of
+    {"camera_id", "name", "source", "fps"} objects).
+    `source` may be a device index, an RTSP/HTTP URL or a file path.
+    Optional detection settings: "roi", a polygon of [x, y] points as
+    fractions of the frame size, and "detect_size", the detector input
+    size in pixels.
+    """
+    cameras = DEFAULT_CAMERAS
+    if os.path.exists(path):
+        with open(path) as f:
+            cameras = json.load(f)
+
+    registry = {}
+    for cam in cameras:
+        camera_id = int(cam["camera_id"])
+        registry[camera_id] = {
+            "camera_id": camera_id,
+            "name": cam.get("name", f"Camera {camera_id}"),
+            "source": _parse_source(cam["source"]),
+            "fps": cam.get("fps", 5),
+            "roi": cam.get("roi"),
+            "detect_size": cam.get("detect_size"),
+        }
+    return registry
+
+
+CAMERAS = load_camera_registry()
+DEFAULT_CAMERA_ID = next(iter(CAMERAS))
+
+
+# ---------------- Camera process ----------------
+def _put_latest(q, item):
+    """Drop-oldest put on a multiprocessing queue."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _run_camera_process(camera_id, source, fps, process_fn, stats_fn, frames, stop_event, profile_mask,
+                        event_queue):
+    """
+    Entry point of a camera's worker process. Capture, inference
+    and recording all run here, with their own copy of the models
+    and tracker state; only encoded frames and stats go back to
+    the web process. Frames are encoded once for each JPEG profile
+    set in `profile_mask` (the profiles that currently have viewers).
+    DB events are forwarded to the web process through `event_queue`.
+    """
+    events.forward_to(event_queue)
+    start_model_warmup(camera_id)     # weights load while the source connects
+    cap = cv2.VideoCapture(source)
+    recorder = create_recorder(LIVE_FEED_FOLDER, fps=fps, prefix=f"live cam{camera_id}",
+                               on_segment_closed=segment_closed)
+    pipeline = LivePipeline(cap, partial(process_fn, camera_id=camera_id), recorder,
+                            fps=fps, drain=is_live_source(source),
+                            encode_fn=lambda frame: encode_profiles(frame, profiles_in_mask(profile_mask.value)))
+    pipeline.start()
+
+    last_stats = 0.0
+    while pipeline.running and not stop_event.is_set():
+        try:
+            chunks = pipeline.output.get(timeout=0.5)
+            _put_latest(frames, ("frame", chunks))
+        except queue.Empty:
+            pass                # still report stats, e.g. model loading before the first frame
+
+        if time.time() - last_stats >= 1.0:
+            stats = pipeline.stats()
+            if stats_fn is not None:
+                stats.update(stats_fn(camera_id))
+            _put_latest(frames, ("stats", stats))
+            last_stats = time.time()
+
+    pipeline.stop()
+
+    # atexit does not run in multiprocessing children: flush explicitly
+    flush_evidence()
+    shutdown_event_writer()
+
+
+# ---------------- Camera worker ----------------
+class CameraWorker:
+    """
+    Runs one camera's capture, inference and recording pipeline in
+    its own process and publishes the encoded frames it sends back
+    to a FrameHub. Any number of viewers can subscribe without
+    adding inference cost.
+    """
+
+    def __init__(self, camera_id, source, process_fn, fps=5, stats_fn=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.process_fn = process_fn
+        self.stats_fn = stats_fn
+        self.fps = fps
+        self.hub = FrameHub()
+        self._process = None
+        self._frames = None
+        self._events = None
+        self._stop_event = None
+        self._stats = {}
+        self._pump = None
+        self._lock = threading.Lock()
+        self._viewers = {}          # profile -> subscribers
+        self._profile_mask = mp.get_context("spawn").Value('i', 0, lock=False)
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            if self._pump is not None:
+                self._pump.join(timeout=10)
+
+            ctx = mp.get_context("spawn")
+            self._frames = ctx.Queue(maxsize=4)
+            self._events = ctx.Queue(maxsize=1000)
+            self._stop_event = ctx.Event()
+            self._process = ctx.Process(
+                target=_run_camera_process,
+                args=(self.camera_id, self.source, self.fps, self.process_fn,
+                      self.stats_fn, self._frames, self._stop_event, self._profile_mask,
+                      self._events),
+                name=f"camera-{self.camera_id}",
+            )
+            self.hub.reopen()
+            self._process.start()
+
+            self._pump = threading.Thread(
+                target=self._publish_loop, args=(self._process, self._frames, self._events),
+                name=f"camera-{self.camera_id}-pump", daemon=True
+            )
+            self._pump.start()
+
+    def _publish_loop(self, process, frames, event_queue):
+        while process.is_alive():
+            events.drain(event_queue)
+            try:
+                kind, payload = frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if kind == "frame":
+                self.hub.publish(payload)
+            else:
+                self._stats = payload
+        events.drain(event_queue)
+        self.hub.close()
+
+    def _count_viewer(self, profile, delta):
+        with self._lock:
+            self._viewers[profile] = self._viewers.get(profile, 0) + delta
+            mask = 0
+            for name, count in self._viewers.items():
+                if count > 0:
+                    mask |= profile_bit(name)
+            self._profile_mask.value = mask
+
+    def subscribe(self, profile=DEFAULT_PROFILE):
+        """Yields the multipart chunk of `profile` for each new frame."""
+        self._count_viewer(profile, 1)
+        try:
+            for chunks in self.hub.subscribe():
+                chunk = chunks.get(profile)
+                if chunk is not None:   # the encoder picks up a new profile within a frame
+                    yield chunk
+        finally:
+            self._count_viewer(profile, -1)
+
+    def stop(self):
+        with self._lock:
+            process = self._process
+            if process is not None:
+                self._stop_event.set()
+            pump = self._pump
+        if process is not None:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        if pump is not None:
+            pump.join(timeout=10)
+
+    def stats(self):
+        return {"camera_id": self.camera_id, "running": self.running,
+                "viewers": self.hub.subscribers, "stages": self._stats}
+
+
+# ---------------- Worker registry ----------------
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(camera_id, process_fn, stats_fn=None):
+    """Returns the single shared worker for a registered camera, creating it on first use."""
+    cam = CAMERAS[camera_id]
+    with _workers_lock:
+        worker = _workers.get(camera_id)
+        if worker is None:
+            worker = CameraWorker(camera_id, cam["source"], process_fn,
+                                  fps=cam["fps"], stats_fn=stats_fn)
+            _workers[camera_id] = worker
+    return worker
+
+
+def stop_all_workers():
+    with _workers_lock:
+        workers = list(_workers.values())
+    for worker in workers:
+        worker.stop()
+
+
+atexit.register(stop_all_workers)
@@ -1,12 +1,31 @@
 import sqlite3
 from datetime import datetime
+import atexit
 import os
+import queue
+import re
+import threading
+import time
+
+import events
 
 DB_DIR = "databases"
 ANPR_DB = os.path.join(DB_DIR, "anpr.db")
 PPE_DB = os.path.join(DB_DIR, "ppe.db")
 AUTH_DB = os.path.join(DB_DIR, "auth.db")  
 WATCHLIST_DB = os.path.join(DB_DIR, "vehicle_watchlist.db")
+JOBS_DB = os.path.join(DB_DIR, "jobs.db")
+
+# ISO timestamps sort and range-scan as plain text
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+PAGE_SIZE = 50
+
+# ---------------- WRITE-BEHIND SETTINGS ----------------
+WRITE_BATCH_SIZE = 200      # commit after this many queued writes
+WRITE_BATCH_SECONDS = 1.0   # ... or after this long, whichever first
+WRITE_BUSY_TIMEOUT_MS = 5000    # wait this long for another process's write lock
+WRITE_RETRIES = 3               # batch attempts before falling back to row by row
+WRITE_RETRY_SECONDS = 0.25      # backoff before the first retry, doubled after each
 
 def init_databases():
     os.makedirs(DB_DIR, exist_ok=True)
@@ -28,6 +47,7 @@ def init_databases():
 
     # ---------------- ANPR DATABASE ----------------
     conn = sqlite3.connect(ANPR_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
     cur = conn.cursor()
     cur.execute("""
         CREATE TABLE IF NOT EXISTS anpr_events (
@@ -40,24 +60,288 @@ def init_databases():
             camera_id INTEGER
         )
     """)
+    migrate_timestamps(cur, "anpr_events")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_anpr_timestamp ON anpr_events (timestamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_anpr_camera ON anpr_events (camera_id, timestamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_anpr_plate ON anpr_events (plate_number)")
+    create_plate_index(cur)
     conn.commit()
     conn.close()
 
     # ---------------- PPE DATABASE ----------------
     conn = sqlite3.connect(PPE_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    cur = conn.cursor()
+    migrate_ppe_keys(cur)
+    create_ppe_tables(cur)
+    migrate_timestamps(cur, "ppe_violations", "ppe_person_violations")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ppe_timestamp ON ppe_violations (timestamp)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ppe_camera ON ppe_violations (camera_id, timestamp)")
+    conn.commit()
+    conn.close()
+
+    # ---------------- WATCHLIST DATABASE ----------------
+    conn = sqlite3.connect(WATCHLIST_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plate_number TEXT UNIQUE,
+            reason TEXT,
+            added_at TEXT
+        )
+    """)
+    # change log filled by triggers, so running engines can reload incrementally
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT,
+            plate_number TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS watchlist_added AFTER INSERT ON watchlist BEGIN
+            INSERT INTO watchlist_changes (op, plate_number) VALUES ('add', NEW.plate_number);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS watchlist_removed AFTER DELETE ON watchlist BEGIN
+            INSERT INTO watchlist_changes (op, plate_number) VALUES ('remove', OLD.plate_number);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS watchlist_updated AFTER UPDATE ON watchlist BEGIN
+            INSERT INTO watchlist_changes (op, plate_number) VALUES ('remove', OLD.plate_number);
+            INSERT INTO watchlist_changes (op, plate_number) VALUES ('add', NEW.plate_number);
+        END
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS watchlist_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plate_number TEXT,
+            watch_plate TEXT,
+            match_type TEXT,
+            distance INTEGER,
+            track_id INTEGER,
+            camera_id INTEGER,
+            timestamp TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON watchlist_alerts (timestamp)")
+    conn.commit()
+    conn.close()
+
+    # ---------------- JOBS DATABASE ----------------
+    conn = sqlite3.connect(JOBS_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
     cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS transcode_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT UNIQUE,
+            output TEXT,
+            status TEXT,
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transcode_status ON transcode_jobs (status, id)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT,
+            stride INTEGER,
+            status TEXT,
+            frames_done INTEGER DEFAULT 0,
+            frames_total INTEGER DEFAULT 0,
+            output TEXT,
+            detections TEXT,
+            error TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_analysis_status ON analysis_jobs (status, id)")
+    conn.commit()
+    conn.close()
+
+
+def migrate_timestamps(cur, *tables):
+    """
+    Rewrites legacy "%d-%m-%Y %H:%M:%S" timestamps as ISO
+    "%Y-%m-%d %H:%M:%S". Runs once per database (PRAGMA user_version).
+    """
+    cur.execute("PRAGMA user_version")
+    if cur.fetchone()[0] >= 1:
+        return
+
+    for table in tables:
+        cur.execute(f"""
+            UPDATE {table}
+            SET timestamp = substr(timestamp, 7, 4) || '-' || substr(timestamp, 4, 2)
+                            || '-' || substr(timestamp, 1, 2) || substr(timestamp, 11)
+            WHERE timestamp LIKE '__-__-____ %'
+        """)
+
+    cur.execute("PRAGMA user_version = 1")
+
+
+def create_plate_index(cur):
+    """
+    Search structures for plate history:
+    - anpr_plates: one row per distinct plate with first/last sighting
+    - anpr_plates_fts: FTS5 trigram index over anpr_plates (substring / fuzzy)
+    Both are kept current by a trigger on anpr_events, and filled from
+    existing rows once (PRAGMA user_version 2).
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS anpr_plates (
+            plate_number TEXT PRIMARY KEY,
+            first_seen TEXT,
+            last_seen TEXT,
+            sightings INTEGER
+        )
+    """)
+
+    try:
+        cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS anpr_plates_fts USING fts5(plate_number, tokenize='trigram')")
+        fts_insert = """
+            INSERT INTO anpr_plates_fts (plate_number)
+            SELECT NEW.plate_number
+            WHERE NOT EXISTS (SELECT 1 FROM anpr_plates WHERE plate_number = NEW.plate_number);
+        """
+    except sqlite3.OperationalError:
+        # SQLite < 3.34 has no trigram tokenizer; substring search falls back to LIKE
+        fts_insert = ""
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS anpr_plate_seen AFTER INSERT ON anpr_events BEGIN
+            {fts_insert}
+            INSERT INTO anpr_plates (plate_number, first_seen, last_seen, sightings)
+            VALUES (NEW.plate_number, NEW.timestamp, NEW.timestamp, 1)
+            ON CONFLICT(plate_number) DO UPDATE SET
+                last_seen = MAX(last_seen, excluded.last_seen),
+                sightings = sightings + 1;
+        END
+    """)
+
+    # a corrected plate (correct_anpr_plate) moves its sighting to the new plate
+    fts_delete = """
+        DELETE FROM anpr_plates_fts WHERE plate_number = OLD.plate_number
+            AND EXISTS (SELECT 1 FROM anpr_plates WHERE plate_number = OLD.plate_number AND sightings <= 0);
+    """ if fts_insert else ""
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS anpr_plate_corrected AFTER UPDATE OF plate_number ON anpr_events BEGIN
+            {fts_insert}
+            INSERT INTO anpr_plates (plate_number, first_seen, last_seen, sightings)
+            VALUES (NEW.plate_number, NEW.timestamp, NEW.timestamp, 1)
+            ON CONFLICT(plate_number) DO UPDATE SET
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen),
+                sightings = sightings + 1;
+            UPDATE anpr_plates SET sightings = sightings - 1 WHERE plate_number = OLD.plate_number;
+            {fts_delete}
+            DELETE FROM anpr_plates WHERE plate_number = OLD.plate_number AND sightings <= 0;
+        END
+    """)
+
+    cur.execute("PRAGMA user_version")
+    if cur.fetchone()[0] >= 2:
+        return
+
+    cur.execute("""
+        INSERT OR IGNORE INTO anpr_plates (plate_number, first_seen, last_seen, sightings)
+        SELECT plate_number, MIN(timestamp), MAX(timestamp), COUNT(*)
+        FROM anpr_events
+        GROUP BY plate_number
+    """)
+    if has_plate_fts(cur):
+        cur.execute("DELETE FROM anpr_plates_fts")
+        cur.execute("INSERT INTO anpr_plates_fts (plate_number) SELECT plate_number FROM anpr_plates")
+    cur.execute("PRAGMA user_version = 2")
+
+
+def has_plate_fts(cur):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'anpr_plates_fts'")
+    return cur.fetchone() is not None
+
+
+def create_ppe_tables(cur):
+    """
+    One ppe_violations row per tracked person. Tracker IDs restart per
+    camera, upload, analysis job and process, so a person is identified
+    by (camera_id, session, person_id), `session` being the engine
+    state that issued the ID.
+    """
     cur.execute("""
         CREATE TABLE IF NOT EXISTS ppe_violations (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            person_id INTEGER UNIQUE,
+            session TEXT,
+            person_id INTEGER,
             violations TEXT,
             person_image TEXT,
             timestamp TEXT,
-            camera_id INTEGER
+            camera_id INTEGER,
+            UNIQUE (camera_id, session, person_id)
         )
     """)
-    conn.commit()
-    conn.close()
+    # one row per (person, violation); replaces the comma-joined column
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ppe_person_violations (
+            ppe_id INTEGER,
+            violation TEXT,
+            timestamp TEXT,
+            PRIMARY KEY (ppe_id, violation)
+        )
+    """)
+
+
+def migrate_ppe_keys(cur):
+    """
+    Rebuilds the PPE tables of older databases (no `session` column) with
+    the (camera_id, session, person_id) key. Runs before create_ppe_tables,
+    so the legacy tables are renamed out of the way first. Existing rows
+    keep their id under session 'legacy'; their violations come from the
+    comma-joined column and from a person_id-keyed ppe_person_violations,
+    if the database has one.
+    """
+    cur.execute("PRAGMA table_info(ppe_violations)")
+    columns = [row[1] for row in cur.fetchall()]
+    if not columns or "session" in columns:
+        return          # new database, or already migrated
+
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ppe_person_violations'")
+    has_person_violations = cur.fetchone() is not None
+
+    cur.execute("ALTER TABLE ppe_violations RENAME TO ppe_violations_old")
+    if has_person_violations:
+        cur.execute("ALTER TABLE ppe_person_violations RENAME TO ppe_person_violations_old")
+    create_ppe_tables(cur)
+
+    cur.execute("""
+        INSERT INTO ppe_violations (id, session, person_id, violations, person_image, timestamp, camera_id)
+        SELECT id, 'legacy', person_id, violations, person_image, timestamp, camera_id
+        FROM ppe_violations_old
+    """)
+
+    cur.execute("SELECT id, violations, timestamp FROM ppe_violations_old WHERE violations != ''")
+    cur.executemany(
+        "INSERT OR IGNORE INTO ppe_person_violations (ppe_id, violation, timestamp) VALUES (?, ?, ?)",
+        [(ppe_id, v, timestamp)
+         for ppe_id, violations, timestamp in cur.fetchall()
+         for v in violations.split(", ")]
+    )
+    if has_person_violations:
+        cur.execute("""
+            INSERT OR IGNORE INTO ppe_person_violations (ppe_id, violation, timestamp)
+            SELECT p.id, v.violation, v.timestamp
+            FROM ppe_person_violations_old v JOIN ppe_violations_old p ON p.person_id = v.person_id
+        """)
+        cur.execute("DROP TABLE ppe_person_violations_old")
+    cur.execute("DROP TABLE ppe_violations_old")
 
 
 # ---------------- DEFAULT USER ----------------
@@ -91,68 +375,566 @@ def verify_user(username, password):
     return user is not None
 
 
-# ---------------- ANPR INSERT ----------------
-def insert_anpr_event(track_id, plate_number, vehicle_image, plate_image, camera_id):
-    conn = sqlite3.connect(ANPR_DB)
-    cursor = conn.cursor()
+# ---------------- WRITE-BEHIND EVENT WRITER ----------------
+class EventWriter(threading.Thread):
+    """
+    Background thread that owns one long-lived WAL connection per
+    database and applies queued writes in batched transactions, so
+    the inference loop never waits on a commit.
+    Each job is (db_path, fn, args); fn(cursor, *args) does the write.
+    """
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, batch_seconds=WRITE_BATCH_SECONDS):
+        super().__init__(name="event-writer", daemon=True)
+        self.jobs = queue.Queue()
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.connections = {}
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, db_path, fn, *args):
+        self.jobs.put((db_path, fn, args))
+
+    def _connection(self, db_path):
+        conn = self.connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path)
+            conn.execute(f"PRAGMA busy_timeout={WRITE_BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.connections[db_path] = conn
+        return conn
+
+    def _apply(self, db_path, jobs):
+        conn = self._connection(db_path)
+        cur = conn.cursor()
+        try:
+            for fn, args in jobs:
+                fn(cur, *args)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def _commit(self, batch):
+        """
+        Writes each database's jobs in one transaction. Camera processes
+        share the files, so a locked database is retried with backoff;
+        if the batch still fails, its jobs are applied one by one and
+        only the rows that fail themselves are dropped.
+        """
+        by_db = {}
+        for db_path, fn, args in batch:
+            by_db.setdefault(db_path, []).append((fn, args))
+
+        for db_path, jobs in by_db.items():
+            if not self._apply_batch(db_path, jobs):
+                self._apply_each(db_path, jobs)
 
-    timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    def _apply_batch(self, db_path, jobs):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                self._apply(db_path, jobs)
+            except sqlite3.OperationalError:    # database is locked / busy
+                time.sleep(WRITE_RETRY_SECONDS * 2 ** attempt)
+                continue
+            except sqlite3.Error:
+                return False                    # a bad row; retrying the batch cannot help
+            self.written += len(jobs)
+            return True
+        return False
 
-    cursor.execute("""
+    def _apply_each(self, db_path, jobs):
+        for job in jobs:
+            try:
+                self._apply(db_path, [job])
+                self.written += 1
+            except sqlite3.Error:
+                self.failed += 1
+
+    def run(self):
+        batch = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                job = self.jobs.get(timeout=timeout)
+                if job is None:
+                    stopping = True
+                else:
+                    batch.append(job)
+                    if deadline is None:
+                        deadline = time.time() + self.batch_seconds
+            except queue.Empty:
+                pass
+
+            if batch and (stopping or len(batch) >= self.batch_size or time.time() >= deadline):
+                self._commit(batch)
+                batch = []
+                deadline = None
+
+        for conn in self.connections.values():
+            conn.close()
+
+    def close(self):
+        """Flushes everything queued so far and stops the thread."""
+        self.jobs.put(None)
+        self.join()
+
+    def stats(self):
+        return {"queued": self.jobs.qsize(), "written": self.written, "failed": self.failed}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_event_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = EventWriter()
+            _writer.start()
+    return _writer
+
+def shutdown_event_writer():
+    """Flushes pending writes; call before a worker process exits."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+atexit.register(shutdown_event_writer)
+
+
+# ---------------- ANPR INSERT ----------------
+def _insert_anpr_event(cur, track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id):
+    cur.execute("""
         INSERT INTO anpr_events
         (track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id))
 
+def insert_anpr_event(track_id, plate_number, vehicle_image, plate_image, camera_id):
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    get_event_writer().submit(
+        ANPR_DB, _insert_anpr_event,
+        track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id
+    )
+    events.publish("anpr", {"plate": plate_number, "track_id": track_id, "camera_id": camera_id,
+                            "timestamp": timestamp, "plate_image": plate_image})
+
+
+def _correct_anpr_plate(cur, track_id, camera_id, vehicle_image, plate_number):
+    cur.execute("""
+        UPDATE anpr_events SET plate_number = ?
+        WHERE camera_id = ? AND track_id = ? AND vehicle_image = ?
+    """, (plate_number, camera_id, track_id, vehicle_image))
+
+def correct_anpr_plate(track_id, camera_id, vehicle_image, previous_plate, plate_number):
+    """Replaces the plate of the event written for this track (found by its vehicle image)."""
+    get_event_writer().submit(
+        ANPR_DB, _correct_anpr_plate,
+        track_id, camera_id, vehicle_image, plate_number
+    )
+    events.publish("anpr", {"plate": plate_number, "previous_plate": previous_plate,
+                            "track_id": track_id, "camera_id": camera_id,
+                            "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT)})
+
+
+# ---------------- PPE UPSERT ----------------
+def _upsert_ppe_violation(cur, session, person_id, violation, person_image, timestamp, camera_id):
+    cur.execute("""
+        INSERT INTO ppe_violations
+        (session, person_id, violations, person_image, timestamp, camera_id)
+        VALUES (?, ?, '', ?, ?, ?)
+        ON CONFLICT(camera_id, session, person_id) DO UPDATE SET timestamp=excluded.timestamp
+    """, (session, person_id, person_image, timestamp, camera_id))
+
+    cur.execute("""
+        INSERT INTO ppe_person_violations (ppe_id, violation, timestamp)
+        SELECT id, ?, ? FROM ppe_violations
+        WHERE camera_id = ? AND session = ? AND person_id = ?
+        ON CONFLICT(ppe_id, violation) DO NOTHING
+    """, (violation, timestamp, camera_id, session, person_id))
+
+def upsert_ppe_violation(session, person_id, violation, person_image, camera_id=1):
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    get_event_writer().submit(
+        PPE_DB, _upsert_ppe_violation,
+        session, person_id, violation, person_image, timestamp, camera_id
+    )
+    events.publish("ppe", {"person_id": person_id, "violation": violation, "camera_id": camera_id,
+                           "timestamp": timestamp, "person_image": person_image})
+
+
+# ---------------- WATCHLIST ----------------
+def add_watchlist_plate(plate_number, reason=""):
+    conn = sqlite3.connect(WATCHLIST_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO watchlist (plate_number, reason, added_at) VALUES (?, ?, ?)
+        ON CONFLICT(plate_number) DO UPDATE SET reason=excluded.reason
+    """, (plate_number, reason, datetime.now().strftime(TIMESTAMP_FORMAT)))
     conn.commit()
     conn.close()
 
+def remove_watchlist_plate(plate_number):
+    conn = sqlite3.connect(WATCHLIST_DB)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM watchlist WHERE plate_number=?", (plate_number,))
+    conn.commit()
+    conn.close()
 
-# ---------------- PPE UPSERT ----------------
-def upsert_ppe_violation(person_id, violation, person_image, camera_id=1):
-    conn = sqlite3.connect(PPE_DB)
+def get_watchlist():
+    """Returns (rows, last change seq) so callers can continue with get_watchlist_changes."""
+    conn = sqlite3.connect(WATCHLIST_DB)
     cur = conn.cursor()
+    cur.execute("SELECT plate_number, reason, added_at FROM watchlist ORDER BY plate_number")
+    rows = cur.fetchall()
+    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM watchlist_changes")
+    seq = cur.fetchone()[0]
+    conn.close()
+    return rows, seq
 
-    timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+def get_watchlist_changes(after_seq):
+    """[(seq, op, plate_number, reason)] logged after `after_seq`, oldest first."""
+    conn = sqlite3.connect(WATCHLIST_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.seq, c.op, c.plate_number, w.reason
+        FROM watchlist_changes c
+        LEFT JOIN watchlist w ON w.plate_number = c.plate_number
+        WHERE c.seq > ?
+        ORDER BY c.seq
+    """, (after_seq,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
 
-    cur.execute("SELECT violations FROM ppe_violations WHERE person_id=?", (person_id,))
-    row = cur.fetchone()
+def _insert_watchlist_alert(cur, plate_number, watch_plate, match_type, distance, track_id, camera_id, timestamp):
+    cur.execute("""
+        INSERT INTO watchlist_alerts
+        (plate_number, watch_plate, match_type, distance, track_id, camera_id, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (plate_number, watch_plate, match_type, distance, track_id, camera_id, timestamp))
+
+def insert_watchlist_alert(plate_number, watch_plate, match_type, distance, track_id, camera_id):
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    get_event_writer().submit(
+        WATCHLIST_DB, _insert_watchlist_alert,
+        plate_number, watch_plate, match_type, distance, track_id, camera_id, timestamp
+    )
+    events.publish("watchlist", {"plate": plate_number, "watch_plate": watch_plate, "match": match_type,
+                                 "track_id": track_id, "camera_id": camera_id, "timestamp": timestamp})
+
+def get_watchlist_alerts(limit=PAGE_SIZE):
+    conn = sqlite3.connect(WATCHLIST_DB)
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM watchlist_alerts ORDER BY id DESC LIMIT ?", (limit,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
 
-    if row:
-        existing = set(row[0].split(", "))
-        existing.add(violation)
-        merged = ", ".join(sorted(existing))
 
+# ---------------- TRANSCODE JOBS ----------------
+# status: queued -> running -> done | failed
+def enqueue_transcode_job(source):
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT OR IGNORE INTO transcode_jobs (source, status, created_at, updated_at)
+        VALUES (?, 'queued', ?, ?)
+    """, (source, now, now))
+    conn.commit()
+    conn.close()
+
+def claim_transcode_jobs(limit):
+    """Marks up to `limit` queued jobs as running and returns them as (id, source)."""
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("SELECT id, source FROM transcode_jobs WHERE status='queued' ORDER BY id LIMIT ?", (limit,))
+
+    claimed = []
+    for job_id, source in cur.fetchall():
         cur.execute("""
-            UPDATE ppe_violations
-            SET violations=?, timestamp=?
-            WHERE person_id=?
-        """, (merged, timestamp, person_id))
-    else:
+            UPDATE transcode_jobs SET status='running', attempts=attempts+1, updated_at=?
+            WHERE id=? AND status='queued'
+        """, (now, job_id))
+        if cur.rowcount:
+            claimed.append((job_id, source))
+
+    conn.commit()
+    conn.close()
+    return claimed
+
+def finish_transcode_job(job_id, output=None, error=None):
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE transcode_jobs SET status=?, output=?, error=?, updated_at=?
+        WHERE id=?
+    """, ("done" if output else "failed", output, error, now, job_id))
+    conn.commit()
+    conn.close()
+
+def requeue_stale_transcode_jobs(older_than):
+    """Jobs left 'running' by a process that died go back to the queue."""
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE transcode_jobs SET status='queued'
+        WHERE status='running' AND updated_at < ?
+    """, (older_than,))
+    conn.commit()
+    conn.close()
+
+def get_transcode_jobs(limit=PAGE_SIZE):
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, source, output, status, attempts, error, created_at, updated_at
+        FROM transcode_jobs ORDER BY id DESC LIMIT ?
+    """, (limit,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+# ---------------- ANALYSIS JOBS ----------------
+# status: queued -> running -> done | failed
+ANALYSIS_JOB_FIELDS = ("id", "source", "stride", "status", "frames_done", "frames_total",
+                       "output", "detections", "error", "created_at", "updated_at")
+
+def enqueue_analysis_job(source, stride):
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO analysis_jobs (source, stride, status, created_at, updated_at)
+        VALUES (?, ?, 'queued', ?, ?)
+    """, (source, stride, now, now))
+    job_id = cur.lastrowid
+    conn.commit()
+    conn.close()
+    return job_id
+
+def claim_analysis_jobs(limit):
+    """Marks up to `limit` queued jobs as running and returns them as (id, source, stride)."""
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("SELECT id, source, stride FROM analysis_jobs WHERE status='queued' ORDER BY id LIMIT ?",
+                (limit,))
+
+    claimed = []
+    for job_id, source, stride in cur.fetchall():
         cur.execute("""
-            INSERT INTO ppe_violations 
-            (person_id, violations, person_image, timestamp, camera_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (person_id, violation, person_image, timestamp, camera_id))
+            UPDATE analysis_jobs SET status='running', frames_done=0, updated_at=?
+            WHERE id=? AND status='queued'
+        """, (now, job_id))
+        if cur.rowcount:
+            claimed.append((job_id, source, stride))
 
     conn.commit()
     conn.close()
+    return claimed
+
+def update_analysis_progress(job_id, frames_done, frames_total):
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE analysis_jobs SET frames_done=?, frames_total=?, updated_at=?
+        WHERE id=?
+    """, (frames_done, frames_total, now, job_id))
+    conn.commit()
+    conn.close()
+
+def finish_analysis_job(job_id, output=None, detections=None, error=None):
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE analysis_jobs SET status=?, output=?, detections=?, error=?, updated_at=?
+        WHERE id=?
+    """, ("failed" if error else "done", output, detections, error, now, job_id))
+    conn.commit()
+    conn.close()
+
+def requeue_stale_analysis_jobs(older_than):
+    """Running jobs that stopped reporting progress go back to the queue."""
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE analysis_jobs SET status='queued'
+        WHERE status='running' AND updated_at < ?
+    """, (older_than,))
+    conn.commit()
+    conn.close()
+
+def get_analysis_job(job_id):
+    conn = sqlite3.connect(JOBS_DB)
+    cur = conn.cursor()
+    cur.execute(f"SELECT {', '.join(ANALYSIS_JOB_FIELDS)} FROM analysis_jobs WHERE id=?", (job_id,))
+    row = cur.fetchone()
+    conn.close()
+    return dict(zip(ANALYSIS_JOB_FIELDS, row)) if row else None
+
+
+# ---------------- PAGINATED QUERIES ----------------
+def _page_filters(start, end, camera_id, before):
+    """
+    WHERE clauses shared by the paginated queries. `before` is the
+    (timestamp, id) keyset cursor of the last row already shown.
+    """
+    clauses, params = [], []
+
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp <= ?")
+        params.append(end)
+    if camera_id is not None:
+        clauses.append("camera_id = ?")
+        params.append(camera_id)
+    if before:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+
+    return clauses, params
+
+def _next_cursor(rows, limit, ts_index):
+    if len(rows) < limit:
+        return None
+    return (rows[-1][ts_index], rows[-1][0])
+
+def query_anpr_events(start=None, end=None, camera_id=None, plate=None, before=None, limit=PAGE_SIZE):
+    """
+    Newest-first page of ANPR events. `start`/`end` are ISO timestamps,
+    `plate` matches as a prefix. Returns (rows, cursor of next page or None).
+    """
+    clauses, params = _page_filters(start, end, camera_id, before)
+
+    if plate:
+        # GLOB is case-sensitive, so it can use idx_anpr_plate
+        clauses.append("plate_number GLOB ?")
+        params.append(re.sub(r'[^A-Z0-9]', '', plate.upper()) + "*")
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    conn = sqlite3.connect(ANPR_DB)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT id, track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id
+        FROM anpr_events
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, params + [limit])
+    rows = cur.fetchall()
+    conn.close()
+
+    return rows, _next_cursor(rows, limit, 5)
 
+def query_ppe_violations(start=None, end=None, camera_id=None, before=None, limit=PAGE_SIZE):
+    """Newest-first page of PPE violations, same conventions as query_anpr_events."""
+    clauses, params = _page_filters(start, end, camera_id, before)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
 
-# ---------------- FETCH FUNCTIONS ----------------
-def get_all_anpr_events():
+    conn = sqlite3.connect(PPE_DB)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT p.id, p.person_id,
+               (SELECT GROUP_CONCAT(violation, ', ') FROM
+                    (SELECT violation FROM ppe_person_violations v
+                     WHERE v.ppe_id = p.id ORDER BY violation)),
+               p.person_image, p.timestamp, p.camera_id
+        FROM (SELECT * FROM ppe_violations {where}
+              ORDER BY timestamp DESC, id DESC LIMIT ?) p
+        ORDER BY p.timestamp DESC, p.id DESC
+    """, params + [limit])
+    rows = cur.fetchall()
+    conn.close()
+
+    return rows, _next_cursor(rows, limit, 4)
+
+
+# ---------------- PLATE HISTORY SEARCH ----------------
+def find_plates(query, mode, limit):
+    """
+    Distinct plates matching `query`, as (plate, first_seen, last_seen, sightings).
+    mode: "prefix"    - plate starts with query (primary key range scan)
+          "substring" - plate contains query (trigram index)
+          "trigram"   - plate shares any trigram with query (fuzzy candidates)
+    """
     conn = sqlite3.connect(ANPR_DB)
     cur = conn.cursor()
-    cur.execute("SELECT * FROM anpr_events ORDER BY id DESC")
+    columns = "p.plate_number, p.first_seen, p.last_seen, p.sightings"
+
+    if mode == "prefix":
+        cur.execute(f"""
+            SELECT {columns} FROM anpr_plates p
+            WHERE p.plate_number GLOB ?
+            ORDER BY p.plate_number LIMIT ?
+        """, (query + "*", limit))
+
+    elif len(query) >= 3 and has_plate_fts(cur):
+        if mode == "substring":
+            match = f'"{query}"'
+        else:
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+            match = " OR ".join(f'"{g}"' for g in sorted(grams))
+
+        cur.execute(f"""
+            SELECT {columns} FROM anpr_plates_fts f
+            JOIN anpr_plates p ON p.plate_number = f.plate_number
+            WHERE anpr_plates_fts MATCH ?
+            ORDER BY rank LIMIT ?
+        """, (match, limit))
+
+    else:
+        cur.execute(f"""
+            SELECT {columns} FROM anpr_plates p
+            WHERE p.plate_number LIKE ?
+            ORDER BY p.last_seen DESC LIMIT ?
+        """, (f"%{query}%", limit))
+
     rows = cur.fetchall()
     conn.close()
     return rows
 
+def get_plate_sightings(plates, before=None, limit=PAGE_SIZE):
+    """Newest-first ANPR events of the given plates, keyset-paginated like query_anpr_events."""
+    if not plates:
+        return [], None
 
-def get_all_ppe_violations():
-    conn = sqlite3.connect(PPE_DB)
+    clauses = [f"plate_number IN ({', '.join('?' for _ in plates)})"]
+    params = list(plates)
+    if before:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+
+    conn = sqlite3.connect(ANPR_DB)
     cur = conn.cursor()
-    cur.execute("SELECT * FROM ppe_violations ORDER BY id DESC")
+    cur.execute(f"""
+        SELECT id, track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id
+        FROM anpr_events
+        WHERE {" AND ".join(clauses)}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, params + [limit])
     rows = cur.fetchall()
     conn.close()
-    return rows
\ No newline at end of file
+
+    return rows, _next_cursor(rows, limit, 5)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+from models import get_tracker, reset_tracker
+from camera import CAMERAS
+
+# ---------------- Unified detection / tracking ----------------
+# One COCO YOLO11n pass per frame serves both engines:
+# vehicle tracks go to ANPR, person tracks go to PPE.
+PERSON_CLASSES = [0]
+VEHICLE_CLASSES = [2, 3, 5, 7]  # car, motorcycle, bus, truck
+
+VEHICLE_CONF = 0.4
+PERSON_CONF = 0.5
+
+# The detector sees only the bounding rectangle of a camera's ROI, at
+# DETECT_SIZE (or the camera's detect_size); boxes are mapped back to
+# full-frame pixels, so the engines still crop plates and persons from
+# the original resolution.
+DETECT_SIZE = 640
+
+
+class Tracks:
+    """Tracked boxes of one frame, as (x1, y1, x2, y2, track_id) tuples."""
+
+    def __init__(self):
+        self.vehicles = []
+        self.persons = []
+
+
+class DetectionRegion:
+    """A camera's ROI polygon in pixels for one frame size, and its bounding rectangle."""
+
+    def __init__(self, roi, width, height):
+        self.polygon = None
+        self.rect = (0, 0, width, height)
+
+        if roi:
+            points = np.array([[x * width, y * height] for x, y in roi], dtype=np.int32)
+            x, y, w, h = cv2.boundingRect(points)
+            x, y = max(x, 0), max(y, 0)
+            self.rect = (x, y, min(x + w, width), min(y + h, height))
+            self.polygon = points
+
+    def crop(self, frame):
+        x1, y1, x2, y2 = self.rect
+        return frame[y1:y2, x1:x2]
+
+    def contains(self, x1, y1, x2, y2):
+        """True if the box's bottom-centre (where it meets the road) lies in the ROI."""
+        if self.polygon is None:
+            return True
+        point = ((x1 + x2) / 2, y2)
+        return cv2.pointPolygonTest(self.polygon, point, False) >= 0
+
+
+_regions = {}
+
+def get_detection_region(camera_id, frame):
+    height, width = frame.shape[:2]
+    key = (camera_id, width, height)
+    if key not in _regions:
+        roi = CAMERAS.get(camera_id, {}).get("roi")
+        _regions[key] = DetectionRegion(roi, width, height)
+    return _regions[key]
+
+
+def track_objects(frame, camera_id=1):
+    tracks = Tracks()
+
+    region = get_detection_region(camera_id, frame)
+    offset_x, offset_y = region.rect[:2]
+    detect_size = CAMERAS.get(camera_id, {}).get("detect_size") or DETECT_SIZE
+
+    results = get_tracker("detector", camera_id).track(
+        region.crop(frame),
+        imgsz=detect_size,
+        conf=min(VEHICLE_CONF, PERSON_CONF),
+        classes=PERSON_CLASSES + VEHICLE_CLASSES,
+        persist=True,
+        verbose=False
+    )
+
+    if not results or results[0].boxes is None or results[0].boxes.id is None:
+        return tracks   # no tracked objects yet
+
+    boxes = results[0].boxes.xyxy.cpu().numpy()
+    ids = results[0].boxes.id.cpu().numpy()
+    classes = results[0].boxes.cls.cpu().numpy()
+    confs = results[0].boxes.conf.cpu().numpy()
+
+    for box, track_id, cls, conf in zip(boxes, ids, classes, confs):
+        x1, y1, x2, y2 = map(int, box)
+        x1, x2 = x1 + offset_x, x2 + offset_x
+        y1, y2 = y1 + offset_y, y2 + offset_y
+        if not region.contains(x1, y1, x2, y2):
+            continue
+        cls = int(cls)
+
+        if cls in VEHICLE_CLASSES and conf >= VEHICLE_CONF:
+            tracks.vehicles.append((x1, y1, x2, y2, int(track_id)))
+        elif cls in PERSON_CLASSES and conf >= PERSON_CONF:
+            tracks.persons.append((x1, y1, x2, y2, int(track_id)))
+
+    return tracks
+
+
+def reset_detector(camera_id=1):
+    reset_tracker("detector", camera_id)
@@ -0,0 +1,105 @@
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# ---------------- Live event bus ----------------
+# insert_anpr_event / upsert_ppe_violation / insert_watchlist_alert
+# publish a compact dict here as they queue their DB write. Camera and
+# analysis processes forward their events to the web process over a
+# multiprocessing queue; the web process keeps the last BACKLOG events
+# in memory and wakes every open dashboard stream, so viewers never
+# query SQLite for live updates.
+BACKLOG = 500               # events a reconnecting stream can catch up on
+HEARTBEAT_SECONDS = 15.0    # SSE comment sent on idle streams to keep proxies from closing them
+
+
+class EventBus:
+    def __init__(self, backlog=BACKLOG):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=backlog)    # (seq, kind, payload)
+        self._seq = itertools.count(1)
+        self.last_seq = 0
+        self.published = 0
+        self.subscribers = 0
+
+    def publish(self, kind, payload):
+        with self._cond:
+            self.last_seq = next(self._seq)
+            self._events.append((self.last_seq, kind, payload))
+            self.published += 1
+            self._cond.notify_all()
+
+    def subscribe(self, last_seq=None, timeout=HEARTBEAT_SECONDS):
+        """
+        Yields lists of new (seq, kind, payload) events, or [] after
+        `timeout` seconds without any. Starts after `last_seq` (replaying
+        the backlog) or, by default, with the next event.
+        """
+        with self._cond:
+            self.subscribers += 1
+            # a last_seq from before a server restart is ahead of the new sequence
+            seen = self.last_seq if last_seq is None or last_seq > self.last_seq else last_seq
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.last_seq > seen, timeout)
+                    events = list(itertools.takewhile(lambda e: e[0] > seen, reversed(self._events)))
+                events.reverse()
+                if events:
+                    seen = events[-1][0]
+                yield events
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self):
+        return {"published": self.published, "subscribers": self.subscribers,
+                "last_seq": self.last_seq, "forward_dropped": forward_dropped}
+
+
+bus = EventBus()
+
+# ---------------- Cross-process forwarding ----------------
+_forward_queue = None
+forward_dropped = 0
+
+def forward_to(q):
+    """Called in worker processes: publish() sends events to `q` instead of the local bus."""
+    global _forward_queue
+    _forward_queue = q
+
+def publish(kind, payload):
+    global forward_dropped
+    if _forward_queue is None:
+        bus.publish(kind, payload)
+        return
+    try:
+        _forward_queue.put_nowait((kind, payload))
+    except queue.Full:
+        forward_dropped += 1    # the web process is not draining; live view only, DB has the row
+
+def drain(q):
+    """Called in the web process: moves forwarded events onto the bus."""
+    while True:
+        try:
+            kind, payload = q.get_nowait()
+        except queue.Empty:
+            return
+        bus.publish(kind, payload)
+
+
+# ---------------- Server-Sent Events ----------------
+def sse_stream(last_seq=None):
+    """Text/event-stream chunks for one client."""
+    yield "retry: 3000\n\n"
+    for events in bus.subscribe(last_seq):
+        if not events:
+            yield f": ping {int(time.time())}\n\n"
+            continue
+        yield "".join(
+            f"id: {seq}\nevent: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+            for seq, kind, payload in events
+        )
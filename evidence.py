@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+
+# ---------------- Evidence store ----------------
+# Vehicle, plate and person crops are written off the inference loop
+# by a small thread pool. The path is decided up front from a hash of
+# the pixels, so the DB row can point at it immediately:
+#   static/evidence/<kind>/cam<camera_id>/<YYYY-MM-DD>/<hash>.jpg
+# Tracker IDs restarting after a reboot can no longer overwrite older
+# evidence, and identical crops are stored once. Each image gets a
+# small <hash>_t.jpg thumbnail for the violations page.
+EVIDENCE_DIR = os.path.join("static", "evidence")
+EVIDENCE_WORKERS = int(os.environ.get("EVIDENCE_WORKERS", 2))
+JPEG_QUALITY = 90
+THUMB_WIDTH = 160
+THUMB_SUFFIX = "_t"
+
+
+def thumbnail_path(path):
+    """Thumbnail of an evidence image; older images (no thumbnail) map to themselves."""
+    if not path or not path.startswith(EVIDENCE_DIR):
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}{THUMB_SUFFIX}{ext}"
+
+
+def _write_jpeg(path, image, quality):
+    ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        raise ValueError(f"could not encode {path}")
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)      # readers never see a half-written file
+
+
+class EvidenceStore:
+    def __init__(self, root=EVIDENCE_DIR, workers=EVIDENCE_WORKERS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence")
+        self._cond = threading.Condition()
+        self.pending = 0
+        self.written = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.total_latency = 0.0
+
+    def save(self, kind, camera_id, image):
+        """Queues `image` for writing and returns the path it will have."""
+        image = image.copy()    # crops are views of a frame that is drawn on next
+        digest = hashlib.blake2b(image.tobytes(), digest_size=10)
+        digest.update(str(image.shape).encode())
+        day = datetime.now().strftime("%Y-%m-%d")
+        path = os.path.join(self.root, kind, f"cam{camera_id}", day, f"{digest.hexdigest()}.jpg")
+
+        with self._cond:
+            self.pending += 1
+        self.executor.submit(self._write, path, image, time.time())
+        return path
+
+    def _write(self, path, image, queued_at):
+        outcome = "written"
+        try:
+            if os.path.exists(path):
+                outcome = "deduplicated"
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _write_jpeg(path, image, JPEG_QUALITY)
+
+                height, width = image.shape[:2]
+                if width > THUMB_WIDTH:
+                    size = (THUMB_WIDTH, max(1, height * THUMB_WIDTH // width))
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                _write_jpeg(thumbnail_path(path), image, JPEG_QUALITY)
+        except Exception:
+            outcome = "failed"
+        finally:
+            with self._cond:
+                self.pending -= 1
+                if outcome == "written":
+                    self.written += 1
+                    self.total_latency += time.time() - queued_at
+                elif outcome == "deduplicated":
+                    self.deduplicated += 1
+                else:
+                    self.failed += 1
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every queued image is on disk."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.pending == 0, timeout)
+
+    def stats(self):
+        return {
+            "evidence_queue": self.pending,
+            "evidence_written": self.written,
+            "evidence_deduplicated": self.deduplicated,
+            "evidence_failed": self.failed,
+            "evidence_avg_latency_ms": round(1000 * self.total_latency / self.written, 1)
+            if self.written else 0.0,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_evidence_store():
+    """Process-wide store, started on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EvidenceStore()
+    return _store
+
+def save_evidence(kind, camera_id, image):
+    return get_evidence_store().save(kind, camera_id, image)
+
+def flush_evidence(timeout=None):
+    """Call before a worker process exits or reports a job done."""
+    if _store is not None:
+        _store.flush(timeout)
@@ -0,0 +1,70 @@
+import os
+
+import cv2
+
+# ---------------- Encode-once JPEG profiles ----------------
+# Each processed frame is encoded once per profile that has viewers,
+# and the bytes are wrapped into the complete multipart chunk right
+# away; every viewer of that profile is then sent the same bytes
+# object, with no per-viewer encoding or copying.
+PROFILES = {
+    "full":  {"quality": 80, "width": None},
+    "thumb": {"quality": 60, "width": 320},
+}
+PROFILE_NAMES = list(PROFILES)      # bit i of a profile mask is PROFILE_NAMES[i]
+DEFAULT_PROFILE = "full"
+
+CHUNK_HEAD = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+CHUNK_TAIL = b'\r\n'
+
+# "turbo" uses libjpeg-turbo through PyTurboJPEG when it is installed
+JPEG_BACKEND = os.environ.get("JPEG_BACKEND", "turbo")
+
+try:
+    from turbojpeg import TurboJPEG
+    _turbo = TurboJPEG() if JPEG_BACKEND == "turbo" else None
+except (ImportError, OSError):     # module missing, or libturbojpeg not found
+    _turbo = None
+
+
+def backend_name():
+    return "turbojpeg" if _turbo is not None else "opencv"
+
+
+def encode_jpeg(frame, quality):
+    """JPEG bytes (or a buffer object) of a BGR frame."""
+    if _turbo is not None:
+        return _turbo.encode(frame, quality=quality)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer if ret else None
+
+
+def resize_for(frame, width):
+    if width is None or frame.shape[1] <= width:
+        return frame
+    height = frame.shape[0] * width // frame.shape[1]
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def multipart_chunk(jpeg):
+    # join reads the encoder's buffer directly: one copy, no tobytes()
+    return b"".join((CHUNK_HEAD, jpeg, CHUNK_TAIL))
+
+
+def encode_profiles(frame, names=(DEFAULT_PROFILE,)):
+    """{profile name: multipart chunk} for the requested profiles."""
+    chunks = {}
+    for name in names:
+        profile = PROFILES[name]
+        jpeg = encode_jpeg(resize_for(frame, profile["width"]), profile["quality"])
+        if jpeg is not None:
+            chunks[name] = multipart_chunk(jpeg)
+    return chunks
+
+
+def profiles_in_mask(mask):
+    return [name for i, name in enumerate(PROFILE_NAMES) if mask & (1 << i)]
+
+
+def profile_bit(name):
+    return 1 << PROFILE_NAMES.index(name)
@@ -1,5 +1,5 @@
 import re
-from collections import defaultdict, Counter
+import cv2
 
 # ---------------- Plate preprocessing ----------------
 def preprocess_plate(text):
@@ -22,11 +22,55 @@ def preprocess_plate(text):
 
     return text
 
-# ---------------- Buffers ----------------
-def init_buffers():
+# ---------------- Plate similarity ----------------
+def within_distance(a, b, max_distance):
+    """Levenshtein distance of a and b if <= max_distance, else None."""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+
+    return previous[-1] if previous[-1] <= max_distance else None
+
+# ---------------- Letterbox ----------------
+def letterbox(img, size=640, color=(114, 114, 114)):
+    """
+    Resizes `img` to fit a size x size square keeping its aspect
+    ratio and pads the rest, so crops of any shape can share a batch.
+    Returns (image, scale, (pad_x, pad_y)).
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+
+    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+    top = (size - nh) // 2
+    left = (size - nw) // 2
+    padded = cv2.copyMakeBorder(
+        resized, top, size - nh - top, left, size - nw - left,
+        cv2.BORDER_CONSTANT, value=color
+    )
+    return padded, scale, (left, top)
+
+def unletterbox_boxes(boxes, scale, pad, shape):
     """
-    Initializes buffers for first 5 frames per vehicle
+    Maps xyxy boxes predicted on a letterboxed image back to the
+    coordinates of the original image of `shape`.
     """
-    plate_buffer = defaultdict(list)  # store first MAX_FRAMES OCR results per vehicle
-    final_plate = {}                  # frozen plate per vehicle
-    return plate_buffer, final_plate
+    h, w = shape[:2]
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / scale).clip(0, w)
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / scale).clip(0, h)
+    return boxes
@@ -0,0 +1,190 @@
+import math
+import os
+import re
+import struct
+import time
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import quote
+
+from recorder import LIVE_FEED_FOLDER, RECORDING_IDLE_SECONDS
+
+# ---------------- HLS over recorded segments ----------------
+# The H.264 recorder writes fragmented MP4 (ftyp+moov, then moof+mdat
+# pairs, one per keyframe interval). A playlist can address those
+# files in place with byte ranges: the ftyp+moov prefix is the init
+# section (EXT-X-MAP) and every moof+mdat pair is one media segment,
+# so no extra files are written and seeking only fetches what it needs.
+SEGMENT_NAME = re.compile(r"^live cam(\d+) (\d\d\.\d\d\.\d{4} - \d\d\.\d\d\.\d\d)c\.mp4$")
+NAME_TIME_FORMAT = "%d.%m.%Y - %H.%M.%S"
+
+
+def _boxes(f, start, end):
+    """Yields (type, offset, size, header size) of the boxes in [start, end)."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return      # box still being written
+        yield box_type.decode("latin-1"), offset, size, header
+        offset += size
+
+
+def _child(f, offset, size, header, box_type):
+    for child in _boxes(f, offset + header, offset + size):
+        if child[0] == box_type:
+            return child
+    return None
+
+
+def _full_box(f, box):
+    """Seeks past the header of a full box and returns its flags."""
+    f.seek(box[1] + box[3])
+    return struct.unpack(">I", f.read(4))[0] & 0xFFFFFF
+
+
+def _read_moov(f, moov):
+    """(timescale, trex default sample duration) of the first track."""
+    trak = _child(f, *moov[1:], "trak")
+    mdia = trak and _child(f, *trak[1:], "mdia")
+    mdhd = mdia and _child(f, *mdia[1:], "mdhd")
+    if mdhd is None:
+        return None, 0
+
+    f.seek(mdhd[1] + mdhd[3])
+    version = f.read(1)[0]
+    f.seek(mdhd[1] + mdhd[3] + (20 if version == 1 else 12))
+    timescale = struct.unpack(">I", f.read(4))[0]
+
+    default_duration = 0
+    mvex = _child(f, *moov[1:], "mvex")
+    trex = mvex and _child(f, *mvex[1:], "trex")
+    if trex:
+        f.seek(trex[1] + trex[3] + 12)
+        default_duration = struct.unpack(">I", f.read(4))[0]
+    return timescale, default_duration
+
+
+def _fragment_ticks(f, moof, default_duration):
+    """Duration of one moof in media timescale ticks."""
+    traf = _child(f, *moof[1:], "traf")
+    if traf is None:
+        return 0
+
+    tfhd = _child(f, *traf[1:], "tfhd")
+    if tfhd:
+        flags = _full_box(f, tfhd)
+        skip = 4 + (8 if flags & 0x01 else 0) + (4 if flags & 0x02 else 0)
+        if flags & 0x08:
+            f.seek(tfhd[1] + tfhd[3] + 4 + skip)
+            default_duration = struct.unpack(">I", f.read(4))[0]
+
+    ticks = 0
+    for trun in _boxes(f, traf[1] + traf[3], traf[1] + traf[2]):
+        if trun[0] != "trun":
+            continue
+        flags = _full_box(f, trun)
+        count = struct.unpack(">I", f.read(4))[0]
+        if flags & 0x01:
+            f.read(4)
+        if flags & 0x04:
+            f.read(4)
+        if not flags & 0x100:
+            ticks += count * default_duration
+            continue
+
+        fields = bin(flags & 0xF00).count("1")
+        for _ in range(count):
+            values = struct.unpack(f">{fields}I", f.read(4 * fields))
+            ticks += values[0]
+    return ticks
+
+
+@lru_cache(maxsize=4096)
+def fragment_index(path, size, mtime):
+    """
+    (init length, [(offset, length, seconds)]) of a fragmented MP4, or
+    None for files that are not fragmented. `size` and `mtime` are part
+    of the cache key so segments still being recorded are re-indexed.
+    """
+    with open(path, "rb") as f:
+        top = list(_boxes(f, 0, size))
+        moov = next((b for b in top if b[0] == "moov"), None)
+        if moov is None or not any(b[0] == "moof" for b in top):
+            return None
+
+        timescale, default_duration = _read_moov(f, moov)
+        if not timescale:
+            return None
+
+        fragments = []
+        for i, box in enumerate(top):
+            if box[0] != "moof" or i + 1 >= len(top) or top[i + 1][0] != "mdat":
+                continue
+            mdat = top[i + 1]
+            seconds = _fragment_ticks(f, box, default_duration) / timescale
+            fragments.append((box[1], mdat[1] + mdat[2] - box[1], seconds))
+
+    return moov[1] + moov[2], fragments
+
+
+def camera_segments(camera_id, day=None, folder=LIVE_FEED_FOLDER):
+    """Recorded files of `camera_id` (optionally of one date), oldest first."""
+    segments = []
+    for name in os.listdir(folder):
+        m = SEGMENT_NAME.match(name)
+        if not m or int(m.group(1)) != camera_id:
+            continue
+        started = datetime.strptime(m.group(2), NAME_TIME_FORMAT)
+        if day is None or started.date() == day:
+            segments.append((started, name))
+    return [name for _, name in sorted(segments)]
+
+
+def build_playlist(camera_id, day=None, folder=LIVE_FEED_FOLDER, url_prefix="/static/Live Feed/"):
+    """
+    HLS media playlist over the fragmented segments of one camera.
+    Stays an open EVENT playlist while the newest file is still growing.
+    """
+    entries = []
+    recording = False
+    for name in camera_segments(camera_id, day, folder):
+        path = os.path.join(folder, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        recording = stat.st_mtime > time.time() - RECORDING_IDLE_SECONDS
+        index = fragment_index(path, stat.st_size, stat.st_mtime)
+        if index and index[1]:
+            entries.append((quote(url_prefix + name), index))
+
+    lines = []
+    longest = 1
+    for i, (url, (init_length, fragments)) in enumerate(entries):
+        if i:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines.append(f'#EXT-X-MAP:URI="{url}",BYTERANGE="{init_length}@0"')
+        for offset, length, seconds in fragments:
+            longest = max(longest, math.ceil(seconds))
+            lines.append(f"#EXTINF:{seconds:.3f},")
+            lines.append(f"#EXT-X-BYTERANGE:{length}@{offset}")
+            lines.append(url)
+
+    header = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{longest}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:" + ("EVENT" if recording else "VOD"),
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+    ]
+    footer = [] if recording else ["#EXT-X-ENDLIST"]
+    return "\n".join(header + lines + footer) + "\n"
@@ -0,0 +1,66 @@
+from detector import track_objects, get_detection_region
+from anpr_engine import run_anpr_on_frame, get_anpr_stats, get_anpr_state, draw_carried_vehicles
+from ppe_engine import run_ppe_on_frame, get_ppe_stats, get_ppe_state, draw_carried_persons
+from motion import get_motion_gate
+from evidence import get_evidence_store
+from models import model_status
+
+
+def _run_engines(frame, camera_id, wait_ocr):
+    gate = get_motion_gate(camera_id)
+
+    # static ROI: no inference, last boxes carried forward
+    roi_view = get_detection_region(camera_id, frame).crop(frame)
+    if not gate.should_detect(roi_view, force=wait_ocr):
+        tracks = gate.last_tracks
+        frame = draw_carried_vehicles(frame, camera_id, tracks.vehicles)
+        frame = draw_carried_persons(frame, camera_id, tracks.persons)
+        return frame, tracks
+
+    tracks = track_objects(frame, camera_id)
+    gate.last_tracks = tracks
+
+    frame = run_anpr_on_frame(frame, camera_id=camera_id, vehicles=tracks.vehicles, wait_ocr=wait_ocr)
+    frame = run_ppe_on_frame(frame, camera_id=camera_id, persons=tracks.persons)
+    return frame, tracks
+
+
+def process_frame(frame, camera_id=1, wait_ocr=False):
+    """
+    Runs the full ANPR + PPE stack on one frame of `camera_id`.
+    `wait_ocr` blocks until plate reads finish (single images).
+    """
+    frame, _ = _run_engines(frame, camera_id, wait_ocr)
+    return frame
+
+
+def analyze_frame(frame, camera_id=1, wait_ocr=False):
+    """
+    Like process_frame, but also returns what was found on the frame:
+    {"vehicles": [{id, box, plate}], "persons": [{id, box, violations}]}
+    with the plate / violations known for each track so far.
+    """
+    frame, tracks = _run_engines(frame, camera_id, wait_ocr)
+    anpr_tracks = get_anpr_state(camera_id).tracks
+    ppe_tracks = get_ppe_state(camera_id).tracks
+
+    vehicles = []
+    for x1, y1, x2, y2, vid in tracks.vehicles:
+        track = anpr_tracks.get(vid)
+        vehicles.append({"id": vid, "box": [x1, y1, x2, y2],
+                         "plate": track.plate if track else None})
+
+    persons = []
+    for x1, y1, x2, y2, pid in tracks.persons:
+        track = ppe_tracks.get(pid)
+        persons.append({"id": pid, "box": [x1, y1, x2, y2],
+                        "violations": sorted(track.violations) if track else []})
+
+    return frame, {"vehicles": vehicles, "persons": persons}
+
+
+def engine_stats(camera_id=1):
+    """Per-camera engine counters, reported next to the pipeline stage stats."""
+    return {"anpr": get_anpr_stats(camera_id), "ppe": get_ppe_stats(camera_id),
+            "motion": get_motion_gate(camera_id).stats(),
+            "evidence": get_evidence_store().stats(), "models": model_status()}
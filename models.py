@@ -1,20 +1,213 @@
-from ultralytics import YOLO
-from paddleocr import PaddleOCR
-import cv2
-import re
+import os
+import threading
+import time
+from functools import partial
 
-# ---------------- YOLO Models ----------------
+import numpy as np
 
-# Vehicle detection / tracking
-vehicle_model = YOLO("models/yolo11n.pt")
+from ocr_pool import get_ocr_pool
 
-# Number plate detection
-plate_model = YOLO("models/best.pt")
+# ---------------- Model registry ----------------
+# Nothing is loaded at import: importing this module (and so app.py,
+# db scripts, the engines) does not pull in ultralytics/torch. Each
+# model is loaded on first use, or ahead of time by a background
+# warm-up thread in the processes that run inference. Every load is
+# followed by one dummy inference so the first real frame does not
+# pay for kernel selection and allocator warm-up.
+MODEL_WEIGHTS = {
+    "plate": "models/best.pt",      # number plate detection
+    "ppe": "models/ppe_best.pt",    # PPE detection model (your renamed file)
+}
+
+# Vehicle + person detection / tracking (see detector.py).
+# .track(persist=True) keeps tracker state inside the YOLO object,
+# so every camera needs its own instance or track IDs get mixed up.
+TRACKER_WEIGHTS = {
+    "detector": "models/yolo11n.pt",   # shared vehicle + person pass
+}
+
+WARMUP_IMGSZ = 640
+# "0" skips the background warm-up in camera processes; models then load on the first frame
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") != "0"
+
+
+def _load_yolo(weights):
+    from ultralytics import YOLO
+
+    return YOLO(weights)
+
+
+def _warm_up(model):
+    dummy = np.zeros((WARMUP_IMGSZ, WARMUP_IMGSZ, 3), dtype=np.uint8)
+    model.predict(dummy, imgsz=WARMUP_IMGSZ, verbose=False)
+
+
+def _load_ocr_pool(source):
+    pool = get_ocr_pool()
+    pool.on_restart = _ocr_pool_restarted
+    return pool
+
+
+def _warm_ocr_pool(pool):
+    # PaddleOCR loads inside the pool's worker processes; they report the timings
+    return pool.warm_up()
+
+
+class ModelEntry:
+    __slots__ = ("source", "load", "warm", "model", "state", "load_ms", "warmup_ms", "error", "lock")
+
+    def __init__(self, source, load, warm):
+        self.source = source        # weights path, or what the loader builds
+        self.load = load            # load(source) -> model
+        self.warm = warm            # warm(model) -> None, or {"load_ms", "warmup_ms"} measured elsewhere
+        self.model = None
+        self.state = "pending"      # pending | loading | ready | failed
+        self.load_ms = None
+        self.warmup_ms = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Named models, each loaded once per process on first get()."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name, source, load, warm):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = ModelEntry(source, load, warm)
+            return entry
+
+    def get(self, name, source, load=_load_yolo, warm=_warm_up):
+        entry = self._entry(name, source, load, warm)
+        if entry.model is not None:
+            return entry.model
+
+        with entry.lock:        # a second caller waits for the first load instead of repeating it
+            if entry.model is None:
+                entry.state = "loading"
+                try:
+                    start = time.perf_counter()
+                    model = entry.load(entry.source)
+                    loaded = time.perf_counter()
+                    timings = entry.warm(model) or {}
+                except Exception as e:
+                    entry.state = "failed"      # the next get() tries again
+                    entry.error = str(e)
+                    raise
+                entry.load_ms = timings.get("load_ms", round(1000 * (loaded - start), 1))
+                entry.warmup_ms = timings.get("warmup_ms", round(1000 * (time.perf_counter() - loaded), 1))
+                entry.error = None
+                entry.state = "ready"
+                entry.model = model
+        return entry.model
+
+    def invalidate(self, name):
+        """
+        Marks a loaded model as loading again, e.g. after its workers were
+        replaced; the next get() repeats the load and warm-up. Returns
+        whether the model had been ready.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        was_ready = entry.state == "ready"
+        entry.model = None
+        entry.state = "loading"
+        return was_ready
+
+    def loaded(self, name):
+        """The model if it has finished loading, else None; never loads."""
+        entry = self._entries.get(name)
+        return entry.model if entry is not None else None
+
+    def status(self):
+        with self._lock:
+            entries = dict(self._entries)
+        models = {
+            name: {"state": e.state, "source": e.source, "load_ms": e.load_ms,
+                   "warmup_ms": e.warmup_ms, "error": e.error}
+            for name, e in entries.items()
+        }
+        return {"ready": all(e.state == "ready" for e in entries.values()), "models": models}
+
+
+_registry = ModelRegistry()
+
+
+def get_model(name):
+    return _registry.get(name, MODEL_WEIGHTS[name])
+
+
+def warm_ocr():
+    """
+    Starts the OCR pool and waits until its workers have loaded PaddleOCR
+    and run a read. ANPR submits to the pool directly (get_ocr_pool), so
+    live frames never block on this.
+    """
+    return _registry.get("ocr", "paddleocr", _load_ocr_pool, _warm_ocr_pool)
+
+def _ocr_pool_restarted():
+    # the replacement workers start cold: report "loading" until they have
+    # warmed up. Only a pool that was ready is re-warmed, so workers that
+    # crash during their warm-up do not restart the pool in a loop.
+    if _registry.invalidate("ocr"):
+        threading.Thread(target=_run_warmup, args=([warm_ocr],),
+                         name="ocr-rewarm", daemon=True).start()
+
+
+# ---------------- Per-camera trackers ----------------
+def _tracker_name(kind, camera_id):
+    return f"{kind}:cam{camera_id}"
+
+def get_tracker(kind, camera_id):
+    return _registry.get(_tracker_name(kind, camera_id), TRACKER_WEIGHTS[kind])
+
+def reset_tracker(kind, camera_id):
+    """Forgets the tracks (IDs restart); the loaded weights stay in memory."""
+    model = _registry.loaded(_tracker_name(kind, camera_id))
+    predictor = getattr(model, "predictor", None)
+    for tracker in getattr(predictor, "trackers", ()):
+        tracker.reset()
+
+
+# ---------------- Warm-up ----------------
+def _run_warmup(jobs):
+    for job in jobs:
+        try:
+            job()
+        except Exception:
+            pass                # recorded in status(); the first frame retries
+
+def _warm_all(camera_id):
+    jobs = [partial(get_model, name) for name in MODEL_WEIGHTS]
+    if camera_id is not None:
+        jobs += [partial(get_tracker, kind, camera_id) for kind in TRACKER_WEIGHTS]
+    jobs.append(warm_ocr)
+    _run_warmup(jobs)
+
+def start_model_warmup(camera_id=None):
+    """
+    Loads every model (and `camera_id`'s trackers), then the OCR
+    workers, in a background thread. Inference that starts earlier
+    simply waits for the model it needs. Returns the thread, or None
+    when MODEL_WARMUP is off.
+    """
+    if not MODEL_WARMUP:
+        return None
+    thread = threading.Thread(target=_warm_all, args=(camera_id,), name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def model_status():
+    """{"ready": bool, "models": {name: {state, source, load_ms, warmup_ms, error}}}"""
+    return _registry.status()
 
-# PPE detection model (your renamed file)
-ppe_model = YOLO("models/ppe_best.pt")
 
-extra_yolo=YOLO("models/yolo11n(1).pt")
 # PPE classes from your dataset
 PPE_CLASSES = [
     'Hardhat', 'Mask', 'NO-Hardhat', 'NO-Mask',
@@ -24,29 +217,3 @@ PPE_CLASSES = [
 
 # We will ignore these three
 PPE_IGNORE = ['machinery', 'vehicle','Person']
-
-# ---------------- PaddleOCR ----------------
-ocr_reader = PaddleOCR(
-    use_angle_cls=True,
-    lang='en',
-    use_gpu=False,
-    enable_mkldnn=False
-)
-
-def ocr_plate(plate_img):
-    if plate_img is None or plate_img.size == 0:
-        return ""
-
-    gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.equalizeHist(gray)
-    gray = cv2.GaussianBlur(gray, (3,3), 0)
-
-    result = ocr_reader.ocr(gray, cls=True)
-
-    text = ""
-    if result and result[0]:
-        for line in result[0]:
-            text += line[1][0]
-
-    text = re.sub(r'[^A-Z0-9]', '', text.upper())
-    return text
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+
+import cv2
+
+from detector import Tracks
+
+# ---------------- Motion gate ----------------
+# A downscaled, blurred grayscale copy of each frame is compared with a
+# running-average background. Frames where (almost) nothing changed
+# skip detection, plate reads and PPE; the boxes of the last detected
+# frame are carried forward instead. Full detection still runs at least
+# every DETECT_EVERY_N frames so slow changes are picked up.
+MOTION_GATE = os.environ.get("MOTION_GATE", "1") != "0"
+DETECT_EVERY_N = int(os.environ.get("MOTION_DETECT_EVERY", 10))
+MOTION_WIDTH = 160          # width of the frame copy that is differenced
+PIXEL_DELTA = 25            # gray-level change that counts a pixel as moving
+MOTION_FRACTION = 0.002     # share of moving pixels that makes a frame "in motion"
+BACKGROUND_RATE = 0.05      # how fast the background absorbs changes
+
+
+class MotionGate:
+    """Decides per frame of one camera whether the detectors need to run."""
+
+    def __init__(self, enabled=MOTION_GATE, detect_every=DETECT_EVERY_N):
+        self.enabled = enabled
+        self.detect_every = detect_every
+        self.background = None
+        self.frames_since_detect = 0
+        self.last_tracks = Tracks()     # boxes carried over skipped frames
+        self.frames = 0
+        self.motion_frames = 0
+        self.detected_frames = 0
+        self.skipped_frames = 0
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        size = (MOTION_WIDTH, max(1, h * MOTION_WIDTH // w))
+        gray = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def has_motion(self, frame):
+        small = self._small(frame)
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small.astype("float32")
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        moving = cv2.countNonZero(cv2.threshold(diff, PIXEL_DELTA, 255, cv2.THRESH_BINARY)[1])
+        cv2.accumulateWeighted(small, self.background, BACKGROUND_RATE)
+        return moving > MOTION_FRACTION * small.size
+
+    def should_detect(self, frame, force=False):
+        self.frames += 1
+        if not self.enabled:
+            self.detected_frames += 1
+            return True
+
+        motion = self.has_motion(frame)
+        self.motion_frames += motion
+        self.frames_since_detect += 1
+
+        if force or motion or self.frames_since_detect >= self.detect_every:
+            self.frames_since_detect = 0
+            self.detected_frames += 1
+            return True
+
+        self.skipped_frames += 1
+        return False
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "motion_frames": self.motion_frames,
+            "detected_frames": self.detected_frames,
+            "skipped_frames": self.skipped_frames,
+            "skip_ratio": round(self.skipped_frames / self.frames, 3) if self.frames else 0.0,
+        }
+
+
+_gates = {}
+
+def get_motion_gate(camera_id):
+    if camera_id not in _gates:
+        _gates[camera_id] = MotionGate()
+    return _gates[camera_id]
+
+def reset_motion_gate(camera_id):
+    _gates.pop(camera_id, None)
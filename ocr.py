@@ -0,0 +1,33 @@
+import re
+
+import cv2
+
+
+# ---------------- PaddleOCR ----------------
+def create_ocr_reader():
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(
+        use_angle_cls=True,
+        lang='en',
+        use_gpu=False,
+        enable_mkldnn=False
+    )
+
+def read_plate(reader, plate_img):
+    if plate_img is None or plate_img.size == 0:
+        return ""
+
+    gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
+    gray = cv2.equalizeHist(gray)
+    gray = cv2.GaussianBlur(gray, (3,3), 0)
+
+    result = reader.ocr(gray, cls=True)
+
+    text = ""
+    if result and result[0]:
+        for line in result[0]:
+            text += line[1][0]
+
+    text = re.sub(r'[^A-Z0-9]', '', text.upper())
+    return text
@@ -0,0 +1,176 @@
+import atexit
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+from ocr import create_ocr_reader, read_plate
+
+# ---------------- Asynchronous OCR ----------------
+# Plate crops are read by a pool of worker processes, each with its
+# own PaddleOCR instance, so the frame loop never waits on OCR.
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 2))
+
+_reader = None
+_reader_load_ms = None
+_warmup_ms = None
+
+def _warm_read():
+    plate = np.full((60, 240, 3), 255, dtype=np.uint8)
+    cv2.putText(plate, "MH12AB1234", (8, 42), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 0, 0), 2)
+    read_plate(_reader, plate)
+
+def _init_worker():
+    """Loads PaddleOCR and reads a synthetic plate before the worker takes any job."""
+    global _reader, _reader_load_ms, _warmup_ms
+    start = time.perf_counter()
+    _reader = create_ocr_reader()
+    loaded = time.perf_counter()
+    _warm_read()
+    _reader_load_ms = round(1000 * (loaded - start), 1)
+    _warmup_ms = round(1000 * (time.perf_counter() - loaded), 1)
+
+def _run_ocr(plate_img):
+    return read_plate(_reader, plate_img)
+
+def _worker_ready():
+    """(pid, reader load ms, warm-up read ms) of the worker running it."""
+    time.sleep(0.05)        # hold the worker so the other jobs of the round go to other workers
+    return os.getpid(), _reader_load_ms, _warmup_ms
+
+
+class OcrPool:
+    """
+    One job in flight per key (camera_id, track_id). Each job carries
+    a `context` that is handed back with the text when it completes.
+    """
+
+    def __init__(self, workers=OCR_WORKERS):
+        self.workers = workers
+        self.executor = self._new_executor()
+        self.pending = {}       # key -> (future, context, submit time, executor)
+        self._lock = threading.Lock()
+        self.completed_jobs = 0
+        self.failed_jobs = 0
+        self.restarts = 0
+        self.total_latency = 0.0
+        self.on_restart = None      # called after the workers were replaced
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker
+        )
+
+    def _restart(self, broken):
+        """Replaces `broken` after a worker died; its other jobs fail on their own."""
+        with self._lock:
+            if self.executor is not broken:
+                return          # already replaced by another caller
+            self.executor = self._new_executor()
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        if self.on_restart is not None:
+            self.on_restart()
+
+    def warm_up(self):
+        """
+        Starts every worker and waits until each has loaded PaddleOCR and
+        run its warm-up read (both happen in the worker initializer), so
+        the first plate does not pay the cold start. Returns the slowest
+        worker's {"load_ms", "warmup_ms"}.
+        """
+        executor = self.executor
+        timings = {}
+        try:
+            # a worker that is ready early may take several jobs of a round;
+            # repeat until every worker has answered
+            while len(timings) < self.workers:
+                futures = [executor.submit(_worker_ready) for _ in range(self.workers)]
+                for future in futures:
+                    pid, load_ms, warmup_ms = future.result()
+                    timings[pid] = (load_ms, warmup_ms)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        return {"load_ms": max(load_ms for load_ms, _ in timings.values()),
+                "warmup_ms": max(warmup_ms for _, warmup_ms in timings.values())}
+
+    def is_pending(self, key):
+        return key in self.pending
+
+    def submit(self, key, plate_img, context=None):
+        """Returns the job's future, or None when the pool was broken (the read is skipped)."""
+        executor = self.executor
+        try:
+            future = executor.submit(_run_ocr, plate_img)
+        except BrokenProcessPool:
+            self.failed_jobs += 1
+            self._restart(executor)
+            return None
+        with self._lock:
+            self.pending[key] = (future, context, time.time(), executor)
+        return future
+
+    def wait_pending(self, camera_id, timeout=None):
+        """Blocks until every read of `camera_id` in flight has finished (or failed)."""
+        with self._lock:
+            futures = [entry[0] for key, entry in self.pending.items() if key[0] == camera_id]
+        wait(futures, timeout)
+
+    def collect(self, camera_id):
+        """Returns [(track_id, text, context)] for finished jobs of `camera_id`."""
+        finished = []
+        with self._lock:
+            for key, (future, context, submitted, executor) in list(self.pending.items()):
+                if key[0] == camera_id and future.done():
+                    del self.pending[key]
+                    finished.append((key, future, context, submitted, executor))
+
+        done = []
+        for key, future, context, submitted, executor in finished:
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                # a worker crashed (e.g. inside PaddleOCR): start a fresh pool
+                self.failed_jobs += 1
+                self._restart(executor)
+                continue
+            except Exception:
+                self.failed_jobs += 1
+                continue
+
+            self.completed_jobs += 1
+            self.total_latency += time.time() - submitted
+            done.append((key[1], text, context))
+        return done
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "ocr_pending": len(self.pending),
+            "ocr_completed": self.completed_jobs,
+            "ocr_failed": self.failed_jobs,
+            "ocr_pool_restarts": self.restarts,
+            "ocr_avg_latency_ms": round(1000 * self.total_latency / self.completed_jobs, 1)
+            if self.completed_jobs else 0.0,
+        }
+
+
+_pool = None
+
+def get_ocr_pool():
+    """Process-wide pool, started on first use."""
+    global _pool
+    if _pool is None:
+        _pool = OcrPool()
+        atexit.register(_pool.shutdown)
+    return _pool
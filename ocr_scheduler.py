@@ -0,0 +1,78 @@
+import cv2
+
+# ---------------- OCR scheduling ----------------
+# Once a track's plate is frozen, plate detection and OCR are skipped
+# for it: the last plate box is carried along with the vehicle box.
+# OCR runs again only if the carried plate crop is clearly better
+# (bigger and/or sharper) than the one the plate was read from.
+REOCR_QUALITY_GAIN = 1.5
+
+
+def plate_quality(plate_crop):
+    """Pixel area x Laplacian variance: grows with both size and sharpness."""
+    if plate_crop is None or plate_crop.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(plate_crop, cv2.COLOR_BGR2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return float(gray.shape[0] * gray.shape[1] * sharpness)
+
+
+def to_relative(plate_box, vehicle_w, vehicle_h):
+    px1, py1, px2, py2 = plate_box
+    return (px1 / vehicle_w, py1 / vehicle_h, px2 / vehicle_w, py2 / vehicle_h)
+
+
+def from_relative(rel_box, vehicle_w, vehicle_h):
+    rx1, ry1, rx2, ry2 = rel_box
+    return (int(rx1 * vehicle_w), int(ry1 * vehicle_h),
+            int(rx2 * vehicle_w), int(ry2 * vehicle_h))
+
+
+class OcrScheduler:
+    """
+    Decides per AnprTrack record whether plate detection / OCR is
+    needed this frame, and counts the calls it saved.
+    """
+
+    def __init__(self):
+        self.ocr_calls = 0
+        self.ocr_skipped = 0        # resolved-track frames with no plate detection / OCR
+        self.reocr_calls = 0
+
+    def carried_box(self, track, vehicle_crop):
+        """Last known plate box of a resolved track, in current crop coordinates."""
+        h, w = vehicle_crop.shape[:2]
+        return from_relative(track.plate_box, w, h)
+
+    def needs_ocr(self, track, vehicle_crop):
+        """
+        True for unresolved tracks, and for resolved tracks whose
+        carried plate crop has improved by REOCR_QUALITY_GAIN.
+        """
+        if track.plate is None:
+            return True
+
+        px1, py1, px2, py2 = self.carried_box(track, vehicle_crop)
+        quality = plate_quality(vehicle_crop[py1:py2, px1:px2])
+
+        if quality > track.quality * REOCR_QUALITY_GAIN:
+            # remember the new bar even if OCR fails, so a stable
+            # but unreadable crop is not retried every frame
+            track.quality = quality
+            self.reocr_calls += 1
+            return True
+
+        self.ocr_skipped += 1
+        return False
+
+    def resolve(self, track, plate_box, vehicle_crop, plate_crop):
+        h, w = vehicle_crop.shape[:2]
+        track.plate_box = to_relative(plate_box, w, h)
+        track.quality = plate_quality(plate_crop)
+
+    def stats(self):
+        return {
+            "ocr_calls": self.ocr_calls,
+            "ocr_skipped": self.ocr_skipped,
+            "reocr_calls": self.reocr_calls,
+        }
@@ -0,0 +1,209 @@
+import logging
+import queue
+import threading
+import time
+
+import cv2
+
+log = logging.getLogger(__name__)
+
+# ---------------- Bounded drop-oldest queue ----------------
+class DropOldestQueue:
+    """
+    Bounded queue whose put() never blocks:
+    when full, the oldest item is discarded to make room.
+    """
+
+    def __init__(self, maxsize=2):
+        self._q = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._lock:
+            while True:
+                try:
+                    self._q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._q.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        return self._q.get(timeout=timeout)
+
+    def qsize(self):
+        return self._q.qsize()
+
+
+# ---------------- Pipeline stage ----------------
+class Stage(threading.Thread):
+    """
+    Worker thread: takes items from `inbox`, runs `func` on them
+    and pushes non-None results to every queue in `outboxes`.
+    An item whose `func` raises is logged, counted and dropped; the
+    stage carries on with the next one.
+    """
+
+    def __init__(self, name, func, inbox, outboxes=()):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outboxes = list(outboxes)
+        self.running = True
+        self.processed = 0
+        self.errors = 0
+        self.last_error = None
+        self.busy_time = 0.0
+
+    def run(self):
+        while self.running:
+            try:
+                item = self.inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                log.exception("%s stage failed on an item", self.name)
+                continue
+            finally:
+                self.busy_time += time.perf_counter() - start
+                self.processed += 1
+
+            if result is None:
+                continue
+            for out in self.outboxes:
+                out.put(result)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {
+            "processed": self.processed,
+            "avg_ms": round(1000 * self.busy_time / self.processed, 2) if self.processed else 0.0,
+            "queue_depth": self.inbox.qsize(),
+            "dropped": self.inbox.dropped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+# ---------------- Capture ----------------
+class CaptureThread(threading.Thread):
+    """
+    Reads the camera as fast as it delivers frames (so the driver
+    buffer never fills with stale frames) and forwards at most
+    `fps` frames per second downstream.
+
+    With `drain=False` (video files) it sleeps between reads
+    instead, so no footage is skipped.
+    """
+
+    def __init__(self, cap, outbox, fps=5, drain=True):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.outbox = outbox
+        self.frame_interval = 1.0 / fps
+        self.drain = drain
+        self.running = True
+        self.captured = 0
+        self.forwarded = 0
+
+    def run(self):
+        last_sent = 0.0
+        while self.running:
+            success, frame = self.cap.read()
+            if not success:
+                break
+            self.captured += 1
+
+            now = time.time()
+            if now - last_sent < self.frame_interval:
+                if self.drain:
+                    continue
+                time.sleep(self.frame_interval - (now - last_sent))
+            last_sent = time.time()
+
+            self.outbox.put(frame)
+            self.forwarded += 1
+
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {"captured": self.captured, "forwarded": self.forwarded}
+
+
+# ---------------- Live pipeline ----------------
+class LivePipeline:
+    """
+    capture -> inference -> recorder
+                         -> jpeg encoder -> output
+
+    Every link is a DropOldestQueue, so a slow stage loses
+    old frames instead of stalling capture. `encode_fn` turns a
+    processed frame into what goes to `output` (JPEG bytes by default).
+    """
+
+    def __init__(self, cap, process_fn, recorder, fps=5, queue_size=2, drain=True, encode_fn=None):
+        self.cap = cap
+        self.recorder = recorder
+        if encode_fn is not None:
+            self._encode = encode_fn
+
+        self.infer_q = DropOldestQueue(queue_size)
+        self.record_q = DropOldestQueue(queue_size)
+        self.encode_q = DropOldestQueue(queue_size)
+        self.output = DropOldestQueue(queue_size)
+
+        self.capture = CaptureThread(cap, self.infer_q, fps=fps, drain=drain)
+        self.stages = [
+            Stage("inference", process_fn, self.infer_q, [self.record_q, self.encode_q]),
+            Stage("recorder", self._record, self.record_q),
+            Stage("encoder", self._encode, self.encode_q, [self.output]),
+        ]
+
+    def _record(self, frame):
+        self.recorder.write(frame)
+
+    def _encode(self, frame):
+        ret, buffer = cv2.imencode('.jpg', frame)
+        if not ret:
+            return None
+        return buffer.tobytes()
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        self.capture.start()
+
+    @property
+    def running(self):
+        return self.capture.running
+
+    def stop(self):
+        self.capture.stop()
+        self.capture.join(timeout=2)
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(timeout=5)
+        self.cap.release()
+        self.recorder.release()
+
+    def stats(self):
+        data = {"capture": self.capture.stats()}
+        for stage in self.stages:
+            data[stage.name] = stage.stats()
+        return data
@@ -0,0 +1,34 @@
+import re
+
+from db import find_plates, get_plate_sightings, PAGE_SIZE
+from functions import within_distance
+
+# ---------------- Plate history search ----------------
+SEARCH_MODES = ("prefix", "substring", "fuzzy")
+MAX_PLATES = 50            # distinct plates a search may expand to
+FUZZY_CANDIDATES = 500     # trigram candidates checked by edit distance
+
+
+def search_plate_history(query, mode="substring", max_distance=1, before=None, limit=PAGE_SIZE):
+    """
+    "Where has this plate been seen": finds matching distinct plates,
+    then returns their sightings newest first.
+    Returns (plates, events, next cursor).
+    """
+    query = re.sub(r'[^A-Z0-9]', '', query.upper())
+    if not query:
+        return [], [], None
+
+    if mode == "fuzzy":
+        plates = []
+        for row in find_plates(query, "trigram", FUZZY_CANDIDATES):
+            distance = within_distance(query, row[0], max_distance)
+            if distance is not None:
+                plates.append(row + (distance,))
+        plates.sort(key=lambda row: (row[4], row[0]))
+        plates = plates[:MAX_PLATES]
+    else:
+        plates = [row + (0,) for row in find_plates(query, mode, MAX_PLATES)]
+
+    events, next_cursor = get_plate_sightings([row[0] for row in plates], before, limit)
+    return plates, events, next_cursor
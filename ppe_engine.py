@@ -1,93 +1,158 @@
+import uuid
+
 import cv2
-import os
-from models import extra_yolo , ppe_model , PPE_CLASSES
+from models import get_model, PPE_CLASSES
+from detector import track_objects, reset_detector
 from db import upsert_ppe_violation
-
-PPE_DIR = "static/ppe/violations"
-os.makedirs(PPE_DIR, exist_ok=True)
-
-saved_persons = set()
+from functions import letterbox, unletterbox_boxes
+from track_store import TrackStore, PpeTrack
+from evidence import save_evidence
+
+class PpeState:
+    """
+    Per-person records of one camera plus DB write counters. Tracker
+    IDs restart with every new state (process start, reset), so rows
+    are stored under this state's `session` as well as the person ID.
+    """
+
+    def __init__(self):
+        self.session = uuid.uuid4().hex[:12]
+        self.tracks = TrackStore(PpeTrack)
+        self.db_writes = 0
+        self.writes_suppressed = 0   # frames whose violations were already stored
+
+_camera_states = {}
+
+def get_ppe_state(camera_id):
+    if camera_id not in _camera_states:
+        _camera_states[camera_id] = PpeState()
+    return _camera_states[camera_id]
 
 PERSON_CLASS_ID = 0  # from yolo11n.pt
 
-def run_ppe_on_frame(frame, camera_id=1):
-    person_results = extra_yolo.track(frame, classes=[0], conf=0.5, persist=True, verbose=False)
-
-    if not person_results or person_results[0].boxes is None:
-        return frame
-
-    boxes_obj = person_results[0].boxes
-
-    if boxes_obj.xyxy is None or boxes_obj.id is None:
-        return frame   # no tracked persons yet
-
-    p_boxes = boxes_obj.xyxy.cpu().numpy()
-    p_ids = boxes_obj.id.cpu().numpy()
-
-    for (x1, y1, x2, y2), pid in zip(p_boxes, p_ids):
-        x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
-        pid = int(pid)
-
+# ---------------- Batched PPE inference ----------------
+PPE_IMGSZ = 640       # every person crop is letterboxed to this size
+PPE_MAX_BATCH = 16    # crops per ppe_model forward pass
+
+def detect_ppe(person_crops, max_batch=PPE_MAX_BATCH):
+    """
+    Runs ppe_model over all person crops of a frame in batches of
+    at most `max_batch`. Returns, per crop, a list of
+    (class_name, (x1, y1, x2, y2)) in crop coordinates.
+    """
+    detections = [[] for _ in person_crops]
+
+    batch = []
+    for i, crop in enumerate(person_crops):
+        if crop.size == 0:
+            continue
+        img, scale, pad = letterbox(crop, PPE_IMGSZ)
+        batch.append((i, img, scale, pad))
+
+    ppe_model = get_model("ppe")
+    for start in range(0, len(batch), max_batch):
+        chunk = batch[start:start + max_batch]
+        results = ppe_model.predict(
+            [img for _, img, _, _ in chunk],
+            imgsz=PPE_IMGSZ, conf=0.5, verbose=False
+        )
+
+        for (i, _, scale, pad), res in zip(chunk, results):
+            if res.boxes is None or len(res.boxes) == 0:
+                continue
+            v_boxes = unletterbox_boxes(
+                res.boxes.xyxy.cpu().numpy(), scale, pad, person_crops[i].shape
+            )
+            v_classes = res.boxes.cls.cpu().numpy()
+
+            for vbox, vcls in zip(v_boxes, v_classes):
+                detections[i].append((PPE_CLASSES[int(vcls)], tuple(map(int, vbox))))
+
+    return detections
+
+def run_ppe_on_frame(frame, camera_id=1, persons=None):
+    """`persons`: tracked (x1, y1, x2, y2, id) boxes from detector.track_objects."""
+    state = get_ppe_state(camera_id)
+    person_tracks = state.tracks
+    person_tracks.tick()
+
+    if persons is None:
+        persons = track_objects(frame, camera_id).persons
+
+    crops = []
+    tracks = []
+    for x1, y1, x2, y2, pid in persons:
         person_crop = frame[y1:y2, x1:x2]
 
-        # Save person image once
-        img_path = f"{PPE_DIR}/person_{pid}.jpg"
-        if pid not in saved_persons:
-            cv2.imwrite(img_path, person_crop)
-            saved_persons.add(pid)
-
-        # 2. Run PPE model inside person crop
-        ppe_results = ppe_model.predict(person_crop, conf=0.5, verbose=False)
+        # Save person image once (written in the background)
+        track = person_tracks.touch(pid)
+        if track.image is None and person_crop.size > 0:
+            track.image = save_evidence("persons", camera_id, person_crop)
 
-        violations_found = []
+        crops.append(person_crop)
+        tracks.append(track)
 
-        if ppe_results and ppe_results[0].boxes is not None:
-            v_boxes = ppe_results[0].boxes.xyxy.cpu().numpy()
-            v_classes = ppe_results[0].boxes.cls.cpu().numpy()
+    # 2. Run PPE model on every person crop in one batch
+    all_detections = detect_ppe(crops)
 
-            for (vx1, vy1, vx2, vy2), vcls in zip(v_boxes, v_classes):
-                vname = PPE_CLASSES[int(vcls)]
+    # Scatter results back per person
+    for (x1, y1, x2, y2, pid), track, detections in zip(persons, tracks, all_detections):
+        track.boxes = [(vname, vbox) for vname, vbox in detections if vname.startswith("NO-")]
+        violations_found = [vname for vname, _ in track.boxes]
 
-                if not vname.startswith("NO-"):
-                    continue
-
-                vx1, vy1, vx2, vy2 = map(int, (vx1, vy1, vx2, vy2))
-
-                # Draw violation box (RED) on main frame
-                cv2.rectangle(frame,
-                              (x1 + vx1, y1 + vy1),
-                              (x1 + vx2, y1 + vy2),
-                              (0, 0, 255), 2)
-
-                cv2.putText(frame, vname,
-                            (x1 + vx1, y1 + vy1 - 8),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-                violations_found.append(vname)
-
-        # 3. Store merged violations
+        # 3. Store only violations this person has not been stored with yet
         if violations_found:
-            for v in set(violations_found):
+            new_violations = set(violations_found) - track.violations
+            if not new_violations:
+                state.writes_suppressed += 1
+
+            for v in new_violations:
                 upsert_ppe_violation(
+                    session=state.session,
                     person_id=pid,
                     violation=v,
-                    person_image=img_path,
+                    person_image=track.image,
                     camera_id=camera_id
                 )
+                state.db_writes += 1
+
+            track.violations |= new_violations
 
-        # Draw person box (GREEN)
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
-        cv2.putText(frame, f"Person {pid}", (x1, y1-10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+        draw_person(frame, x1, y1, x2, y2, pid, track.boxes)
+
+    return frame
 
+def draw_person(frame, x1, y1, x2, y2, pid, violation_boxes):
+    # Draw violation boxes (RED) on main frame
+    for vname, (vx1, vy1, vx2, vy2) in violation_boxes:
+        cv2.rectangle(frame,
+                      (x1 + vx1, y1 + vy1),
+                      (x1 + vx2, y1 + vy2),
+                      (0, 0, 255), 2)
+
+        cv2.putText(frame, vname,
+                    (x1 + vx1, y1 + vy1 - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+    # Draw person box (GREEN)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
+    cv2.putText(frame, f"Person {pid}", (x1, y1-10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+
+def draw_carried_persons(frame, camera_id, persons):
+    """Redraws carried-forward persons and their last violation boxes on a skipped frame."""
+    person_tracks = get_ppe_state(camera_id).tracks
+    for x1, y1, x2, y2, pid in persons:
+        track = person_tracks.get(pid)
+        draw_person(frame, x1, y1, x2, y2, pid, track.boxes if track is not None else [])
     return frame
 
-def reset_ppe_tracker():
-    global saved_persons
-    saved_persons = set()  # reset saved person IDs
+def reset_ppe_tracker(camera_id=1):
+    _camera_states.pop(camera_id, None)  # reset saved person IDs
+    reset_detector(camera_id)
 
-    try:
-        if hasattr(extra_yolo, "predictor") and extra_yolo.predictor:
-            extra_yolo.predictor.tracker = None
-    except Exception:
-        pass
\ No newline at end of file
+def get_ppe_stats(camera_id):
+    state = get_ppe_state(camera_id)
+    stats = state.tracks.stats()
+    stats.update({"db_writes": state.db_writes, "writes_suppressed": state.writes_suppressed})
+    return stats
@@ -0,0 +1,165 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+LIVE_FEED_FOLDER = os.path.join("static", "Live Feed")
+SEGMENT_SECONDS = 180  # rotate recording every 3 minutes
+RECORDING_IDLE_SECONDS = 10     # a file modified this recently is still being recorded
+
+# "h264" pipes frames into ffmpeg and writes browser-ready files;
+# "opencv" writes mp4v files that the transcoder converts afterwards
+RECORDER_BACKEND = os.environ.get("RECORDER_BACKEND", "h264")
+RECORD_PRESET = os.environ.get("RECORD_PRESET", "veryfast")
+RECORD_CRF = int(os.environ.get("RECORD_CRF", 23))
+
+
+class SegmentRecorder:
+    """
+    Writes processed frames to `<prefix> <timestamp>.mp4`,
+    starting a new file every SEGMENT_SECONDS.
+    The writer is opened lazily from the first frame's size.
+    `on_segment_closed(path)` is called for every finished file.
+    """
+
+    def __init__(self, folder=LIVE_FEED_FOLDER, fps=5, segment_seconds=SEGMENT_SECONDS, prefix="live",
+                 on_segment_closed=None):
+        self.folder = folder
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.prefix = prefix
+        self.fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.on_segment_closed = on_segment_closed
+        self.out = None
+        self.path = None
+        self.start_time = 0.0
+        os.makedirs(folder, exist_ok=True)
+
+    def _new_writer(self, size):
+        timestamp = datetime.now().strftime('%d.%m.%Y - %H.%M.%S')
+        filename = f"{self.prefix} {timestamp}.mp4"
+        self.path = os.path.join(self.folder, filename)
+        self.start_time = time.time()
+        return cv2.VideoWriter(self.path, self.fourcc, self.fps, size)
+
+    def _close(self):
+        self.out.release()
+        self.out = None
+        if self.on_segment_closed is not None:
+            self.on_segment_closed(self.path)
+
+    def write(self, frame):
+        height, width = frame.shape[:2]
+
+        if self.out is None:
+            self.out = self._new_writer((width, height))
+        elif time.time() - self.start_time >= self.segment_seconds:
+            self._close()
+            self.out = self._new_writer((width, height))
+
+        self.out.write(frame)
+
+    def release(self):
+        if self.out is not None:
+            self._close()
+
+
+class H264SegmentRecorder:
+    """
+    Pipes raw frames into one long-lived ffmpeg process that encodes
+    H.264 and cuts fragmented MP4 files every SEGMENT_SECONDS, named
+    `<prefix> <timestamp>c.mp4` like the transcoder's output, so they
+    are playable in the browser as they are written and need no
+    conversion. ffmpeg reports each finished file on stdout, which is
+    turned into `on_segment_closed(path)` calls.
+    """
+
+    def __init__(self, folder=LIVE_FEED_FOLDER, fps=5, segment_seconds=SEGMENT_SECONDS, prefix="live",
+                 on_segment_closed=None, preset=RECORD_PRESET, crf=RECORD_CRF):
+        self.folder = folder
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.prefix = prefix
+        self.preset = preset
+        self.crf = crf
+        self.on_segment_closed = on_segment_closed
+        self.proc = None
+        self.size = None
+        self.reader = None
+        os.makedirs(folder, exist_ok=True)
+
+    def _command(self, size):
+        pattern = os.path.join(self.folder, f"{self.prefix} %d.%m.%Y - %H.%M.%Sc.mp4")
+        return [
+            'ffmpeg', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f"{size[0]}x{size[1]}", '-framerate', str(self.fps),
+            '-i', 'pipe:0',
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+            '-pix_fmt', 'yuv420p',
+            '-g', str(self.fps * 2),     # keyframe (and fragment) every 2 s
+            '-force_key_frames', f"expr:gte(t,n_forced*{self.segment_seconds})",
+            '-f', 'segment', '-segment_time', str(self.segment_seconds),
+            '-reset_timestamps', '1', '-strftime', '1',
+            '-segment_format', 'mp4',
+            '-segment_format_options', 'movflags=+frag_keyframe+empty_moov+default_base_moof',
+            '-segment_list', 'pipe:1', '-segment_list_type', 'flat',
+            pattern
+        ]
+
+    def _start(self, size):
+        self.proc = subprocess.Popen(self._command(size), stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.size = size
+        self.reader = threading.Thread(target=self._read_segments, args=(self.proc,),
+                                       name="recorder-segments", daemon=True)
+        self.reader.start()
+
+    def _read_segments(self, proc):
+        for line in proc.stdout:
+            name = line.decode().strip()
+            if name and self.on_segment_closed is not None:
+                self.on_segment_closed(os.path.join(self.folder, name))
+
+    def _stop(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        self.reader.join()
+        self.proc = None
+
+    def write(self, frame):
+        height, width = frame.shape[:2]
+
+        # a new frame size needs a new encoder
+        if self.proc is not None and self.size != (width, height):
+            self._stop()
+        if self.proc is None:
+            self._start((width, height))
+
+        try:
+            self.proc.stdin.write(frame.tobytes())
+        except (BrokenPipeError, ValueError):
+            # ffmpeg died; finish what it wrote and restart on the next frame
+            self._stop()
+
+    def release(self):
+        if self.proc is not None:
+            self._stop()
+
+
+def create_recorder(folder=LIVE_FEED_FOLDER, fps=5, prefix="live", on_segment_closed=None,
+                    segment_seconds=SEGMENT_SECONDS):
+    """Recorder for RECORDER_BACKEND, falling back to OpenCV without ffmpeg."""
+    if RECORDER_BACKEND == "h264" and shutil.which("ffmpeg"):
+        recorder_type = H264SegmentRecorder
+    else:
+        recorder_type = SegmentRecorder
+    return recorder_type(folder, fps=fps, segment_seconds=segment_seconds, prefix=prefix,
+                         on_segment_closed=on_segment_closed)
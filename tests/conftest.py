@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+# Schema of databases created before any migration existed (baseline db.py)
+BASELINE_SCHEMA = {
+    "anpr.db": """
+        CREATE TABLE anpr_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            track_id INTEGER,
+            plate_number TEXT,
+            vehicle_image TEXT,
+            plate_image TEXT,
+            timestamp TEXT,
+            camera_id INTEGER
+        );
+    """,
+    "ppe.db": """
+        CREATE TABLE ppe_violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_id INTEGER UNIQUE,
+            violations TEXT,
+            person_image TEXT,
+            timestamp TEXT,
+            camera_id INTEGER
+        );
+    """,
+}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test in an empty directory; db paths are relative to it."""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    db.shutdown_event_writer()
+
+
+@pytest.fixture
+def baseline_db(workdir):
+    """Creates databases/<name> with the baseline schema and returns a connection to it."""
+    os.makedirs(db.DB_DIR, exist_ok=True)
+    connections = []
+
+    def create(name):
+        conn = sqlite3.connect(os.path.join(db.DB_DIR, name))
+        conn.executescript(BASELINE_SCHEMA[name])
+        connections.append(conn)
+        return conn
+
+    yield create
+    for conn in connections:
+        conn.close()
+
+
+@pytest.fixture
+def databases(workdir):
+    """Fresh, initialised databases."""
+    db.init_databases()
+    return workdir
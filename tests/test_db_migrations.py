@@ -0,0 +1,93 @@
+import sqlite3
+
+import db
+
+
+def _rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_ppe_upgrade_from_baseline(baseline_db):
+    conn = baseline_db("ppe.db")
+    conn.executemany(
+        "INSERT INTO ppe_violations (person_id, violations, person_image, timestamp, camera_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(3, "NO-Mask, NO-Hardhat", "a.jpg", "01-02-2025 10:00:00", 1),
+         (4, "", "b.jpg", "01-02-2025 11:00:00", 2)],
+    )
+    conn.commit()
+
+    db.init_databases()
+    db.init_databases()
+
+    assert _rows(db.PPE_DB, "SELECT id, session, person_id, person_image, camera_id FROM ppe_violations "
+                            "ORDER BY id") == [(1, "legacy", 3, "a.jpg", 1), (2, "legacy", 4, "b.jpg", 2)]
+    assert _rows(db.PPE_DB, "SELECT ppe_id, violation FROM ppe_person_violations ORDER BY violation") == [
+        (1, "NO-Hardhat"), (1, "NO-Mask")]
+    assert not _rows(db.PPE_DB, "SELECT name FROM sqlite_master WHERE name LIKE '%_old'")
+
+
+def test_ppe_upgrade_from_baseline_empty(baseline_db):
+    baseline_db("ppe.db").commit()
+    db.init_databases()
+
+    columns = [row[1] for row in _rows(db.PPE_DB, "PRAGMA table_info(ppe_person_violations)")]
+    assert columns == ["ppe_id", "violation", "timestamp"]
+
+
+def test_ppe_upgrade_from_person_id_keyed_tables(baseline_db):
+    conn = baseline_db("ppe.db")
+    conn.executescript("""
+        CREATE TABLE ppe_person_violations (
+            person_id INTEGER, violation TEXT, timestamp TEXT, PRIMARY KEY (person_id, violation));
+        INSERT INTO ppe_violations (person_id, violations, person_image, timestamp, camera_id)
+            VALUES (7, '', 'c.jpg', '2025-02-01 10:00:00', 1);
+        INSERT INTO ppe_person_violations VALUES (7, 'NO-Safety Vest', '2025-02-01 10:00:00');
+        PRAGMA user_version = 1;
+    """)
+    conn.commit()
+
+    db.init_databases()
+
+    assert _rows(db.PPE_DB, "SELECT ppe_id, violation FROM ppe_person_violations") == [(1, "NO-Safety Vest")]
+
+
+def test_ppe_rows_keyed_per_camera_and_session(databases):
+    db.upsert_ppe_violation("s1", 3, "NO-Mask", "a.jpg", camera_id=1)
+    db.upsert_ppe_violation("s2", 3, "NO-Mask", "b.jpg", camera_id=2)
+    db.upsert_ppe_violation("s2", 3, "NO-Hardhat", "b.jpg", camera_id=2)
+    db.shutdown_event_writer()
+
+    rows, _ = db.query_ppe_violations()
+    assert sorted((r[1], r[2], r[3], r[5]) for r in rows) == [
+        (3, "NO-Hardhat, NO-Mask", "b.jpg", 2), (3, "NO-Mask", "a.jpg", 1)]
+
+
+def test_timestamps_upgrade_from_baseline(baseline_db):
+    anpr = baseline_db("anpr.db")
+    anpr.execute(
+        "INSERT INTO anpr_events (track_id, plate_number, vehicle_image, plate_image, timestamp, camera_id) "
+        "VALUES (1, 'MH12AB1234', 'v.jpg', 'p.jpg', '31-12-2024 23:59:58', 1)"
+    )
+    anpr.commit()
+    ppe = baseline_db("ppe.db")
+    ppe.execute(
+        "INSERT INTO ppe_violations (person_id, violations, person_image, timestamp, camera_id) "
+        "VALUES (3, 'NO-Mask', 'a.jpg', '01-02-2025 10:00:00', 1)"
+    )
+    ppe.commit()
+
+    db.init_databases()
+    db.init_databases()     # second run must leave everything as it is
+
+    assert _rows(db.ANPR_DB, "SELECT timestamp FROM anpr_events") == [("2024-12-31 23:59:58",)]
+    assert _rows(db.PPE_DB, "SELECT timestamp FROM ppe_violations") == [("2025-02-01 10:00:00",)]
+    assert _rows(db.PPE_DB, "SELECT timestamp FROM ppe_person_violations") == [("2025-02-01 10:00:00",)]
+    assert _rows(db.ANPR_DB, "PRAGMA user_version") == [(2,)]
+    assert _rows(db.PPE_DB, "PRAGMA user_version") == [(1,)]
+    assert _rows(db.ANPR_DB, "SELECT plate_number, first_seen, sightings FROM anpr_plates") == [
+        ("MH12AB1234", "2024-12-31 23:59:58", 1)]
@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+
+
+def _insert(cur, value):
+    cur.execute("INSERT INTO t (x) VALUES (?)", (value,))
+
+
+@pytest.fixture
+def table(workdir, monkeypatch):
+    monkeypatch.setattr(db, "WRITE_BUSY_TIMEOUT_MS", 50)
+    monkeypatch.setattr(db, "WRITE_RETRY_SECONDS", 0.05)
+    path = str(workdir / "writer.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def _values(conn):
+    return [x for (x,) in conn.execute("SELECT x FROM t ORDER BY x")]
+
+
+def test_bad_row_only_drops_itself(table):
+    path, conn = table
+    writer = db.EventWriter()
+    writer.start()
+    for value in (1, 2, 2, 3):      # the second 2 violates the primary key
+        writer.submit(path, _insert, value)
+    writer.close()
+
+    assert _values(conn) == [1, 2, 3]
+    assert writer.stats() == {"queued": 0, "written": 3, "failed": 1}
+
+
+def test_locked_database_is_retried(table):
+    path, conn = table
+    locker = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    locker.execute("BEGIN IMMEDIATE")       # hold the write lock past the busy timeout
+    release = threading.Timer(0.15, locker.execute, ("COMMIT",))
+    release.start()
+
+    writer = db.EventWriter()
+    writer.start()
+    for value in (1, 2, 3):
+        writer.submit(path, _insert, value)
+    writer.close()
+    release.join()
+    locker.close()
+
+    assert _values(conn) == [1, 2, 3]
+    assert writer.stats()["failed"] == 0
@@ -0,0 +1,153 @@
+import os
+import struct
+from datetime import date
+
+import pytest
+
+from hls import build_playlist, fragment_index
+
+TIMESCALE = 90000
+DEFAULT_DURATION = 3000     # trex: 1/30 s per sample
+
+
+def box(box_type, *payload):
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), box_type.encode()) + body
+
+
+def large_box(box_type, *payload):
+    body = b"".join(payload)
+    return struct.pack(">I4sQ", 1, box_type.encode(), 16 + len(body)) + body
+
+
+def full_box(box_type, flags, *payload):
+    return box(box_type, struct.pack(">I", flags), *payload)
+
+
+def init_section():
+    mdhd = full_box("mdhd", 0, struct.pack(">IIII", 0, 0, TIMESCALE, 0), b"\0" * 4)
+    trex = full_box("trex", 0, struct.pack(">IIIII", 1, 1, DEFAULT_DURATION, 0, 0))
+    moov = box("moov",
+               full_box("mvhd", 0, b"\0" * 96),
+               box("trak", box("mdia", mdhd)),
+               box("mvex", trex))
+    return box("ftyp", b"iso5", b"\0\0\0\0", b"iso6mp41") + moov
+
+
+def fragment(samples, tfhd_duration=None, durations=None, large_mdat=False):
+    tfhd_flags, tfhd_fields = 0, struct.pack(">I", 1)
+    if tfhd_duration is not None:
+        tfhd_flags |= 0x08
+        tfhd_fields += struct.pack(">I", tfhd_duration)
+
+    trun_flags, trun_fields = 0x01 | 0x04, struct.pack(">Iii", samples, 0, 0)
+    if durations is not None:
+        trun_flags |= 0x100 | 0x200         # per-sample duration and size
+        trun_fields += b"".join(struct.pack(">II", d, 100) for d in durations)
+
+    moof = box("moof",
+               full_box("mfhd", 0, struct.pack(">I", 1)),
+               box("traf",
+                   full_box("tfhd", tfhd_flags, tfhd_fields),
+                   full_box("tfdt", 0, struct.pack(">I", 0)),
+                   full_box("trun", trun_flags, trun_fields)))
+    mdat = (large_box if large_mdat else box)("mdat", b"\x55" * (100 * samples))
+    return moof, mdat
+
+
+def write_segment(folder, name, *parts, recording=False):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(b"".join(parts))
+    if not recording:
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+    return path
+
+
+@pytest.fixture
+def segments(tmp_path):
+    init = init_section()
+    first = [fragment(30), fragment(10, tfhd_duration=6000)]
+    second = [fragment(3, durations=[45000, 45000, 45000], large_mdat=True)]
+
+    write_segment(tmp_path, "live cam1 01.01.2025 - 10.00.00c.mp4",
+                  init, *(b for pair in first for b in pair))
+    write_segment(tmp_path, "live cam1 01.01.2025 - 10.05.00c.mp4",
+                  init, *second[0],
+                  fragment(30)[0][:20])     # moof still being written
+    write_segment(tmp_path, "live cam1 01.01.2025 - 10.10.00c.mp4",   # not fragmented
+                  init, box("mdat", b"\0" * 64))
+    write_segment(tmp_path, "live cam2 01.01.2025 - 10.00.00c.mp4",
+                  init, *first[0])
+    write_segment(tmp_path, "live cam1 02.01.2025 - 10.00.00c.mp4",
+                  init, *first[0])
+    return tmp_path, init, first, second
+
+
+def test_fragment_index(segments):
+    folder, init, first, second = segments
+    path = os.path.join(folder, "live cam1 01.01.2025 - 10.00.00c.mp4")
+    size = os.path.getsize(path)
+
+    init_length, fragments = fragment_index(path, size, os.path.getmtime(path))
+    assert init_length == len(init)
+
+    moof0, mdat0 = first[0]
+    moof1, mdat1 = first[1]
+    second_offset = len(init) + len(moof0) + len(mdat0)
+    assert fragments == [
+        (len(init), len(moof0) + len(mdat0), 1.0),
+        (second_offset, len(moof1) + len(mdat1), pytest.approx(10 * 6000 / TIMESCALE)),
+    ]
+    assert second_offset + len(moof1) + len(mdat1) == size
+
+
+def test_fragment_index_skips_partial_and_plain_files(segments):
+    folder, init, _, second = segments
+    path = os.path.join(folder, "live cam1 01.01.2025 - 10.05.00c.mp4")
+    _, fragments = fragment_index(path, os.path.getsize(path), os.path.getmtime(path))
+    assert fragments == [(len(init), len(second[0][0]) + len(second[0][1]), 1.5)]
+
+    path = os.path.join(folder, "live cam1 01.01.2025 - 10.10.00c.mp4")
+    assert fragment_index(path, os.path.getsize(path), os.path.getmtime(path)) is None
+
+
+def test_build_playlist(segments):
+    folder, init, first, second = segments
+    url_a = "/static/Live%20Feed/live%20cam1%2001.01.2025%20-%2010.00.00c.mp4"
+    url_b = "/static/Live%20Feed/live%20cam1%2001.01.2025%20-%2010.05.00c.mp4"
+    first_lengths = [len(moof) + len(mdat) for moof, mdat in first]
+    second_length = len(second[0][0]) + len(second[0][1])
+
+    playlist = build_playlist(1, date(2025, 1, 1), folder=str(folder))
+    assert playlist.splitlines() == [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        "#EXT-X-TARGETDURATION:2",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-MAP:URI="{url_a}",BYTERANGE="{len(init)}@0"',
+        "#EXTINF:1.000,",
+        f"#EXT-X-BYTERANGE:{first_lengths[0]}@{len(init)}",
+        url_a,
+        "#EXTINF:0.667,",
+        f"#EXT-X-BYTERANGE:{first_lengths[1]}@{len(init) + first_lengths[0]}",
+        url_a,
+        "#EXT-X-DISCONTINUITY",
+        f'#EXT-X-MAP:URI="{url_b}",BYTERANGE="{len(init)}@0"',
+        "#EXTINF:1.500,",
+        f"#EXT-X-BYTERANGE:{second_length}@{len(init)}",
+        url_b,
+        "#EXT-X-ENDLIST",
+    ]
+
+
+def test_playlist_stays_open_while_recording(segments):
+    folder, init, first, _ = segments
+    write_segment(folder, "live cam1 01.01.2025 - 10.15.00c.mp4", init, *first[0], recording=True)
+
+    playlist = build_playlist(1, date(2025, 1, 1), folder=str(folder))
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in playlist
+    assert "#EXT-X-ENDLIST" not in playlist
+    assert playlist.count("#EXT-X-DISCONTINUITY") == 2
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+import models
+from models import ModelRegistry
+from ocr_pool import OcrPool
+
+
+def test_invalidate_reloads_on_next_get():
+    loads = []
+    registry = ModelRegistry()
+    registry.get("ocr", "paddleocr", lambda source: loads.append(source) or object(), lambda model: None)
+
+    assert registry.invalidate("ocr") is True
+    assert registry.status()["ready"] is False
+    assert registry.status()["models"]["ocr"]["state"] == "loading"
+    assert registry.loaded("ocr") is None
+
+    registry.get("ocr", "paddleocr", lambda source: loads.append(source) or object(), lambda model: None)
+    assert loads == ["paddleocr", "paddleocr"]
+    assert registry.status()["ready"] is True
+    assert registry.invalidate("missing") is False
+
+
+def test_pool_restart_calls_hook_once():
+    pool = OcrPool(workers=1)
+    calls = []
+    pool.on_restart = lambda: calls.append(pool.executor)
+    broken = pool.executor
+    try:
+        pool._restart(broken)
+        pool._restart(broken)       # a second report of the same broken executor
+        assert pool.restarts == 1
+        assert calls == [pool.executor] and pool.executor is not broken
+    finally:
+        pool.shutdown()
+
+
+def test_restart_marks_ocr_loading_until_rewarmed(monkeypatch):
+    registry = ModelRegistry()
+    monkeypatch.setattr(models, "_registry", registry)
+    release = threading.Event()
+    warmed = threading.Event()
+
+    def warm_ocr():
+        release.wait(5)
+        registry.get("ocr", "paddleocr", lambda source: object(), lambda model: None)
+        warmed.set()
+
+    monkeypatch.setattr(models, "warm_ocr", warm_ocr)
+    registry.get("ocr", "paddleocr", lambda source: object(), lambda model: None)
+
+    models._ocr_pool_restarted()
+    assert models.model_status()["models"]["ocr"]["state"] == "loading"
+    release.set()
+    assert warmed.wait(5)
+    assert models.model_status()["ready"] is True
+
+
+def test_failed_warmup_is_not_retried_by_restart(monkeypatch):
+    registry = ModelRegistry()
+    monkeypatch.setattr(models, "_registry", registry)
+    started = []
+    monkeypatch.setattr(models, "_run_warmup", started.append)
+
+    def crash(pool):
+        models._ocr_pool_restarted()        # the pool restarts while its first warm-up fails
+        raise RuntimeError("worker died")
+
+    with pytest.raises(RuntimeError):
+        registry.get("ocr", "paddleocr", lambda source: object(), crash)
+    assert registry.status()["models"]["ocr"]["state"] == "failed"
+    assert started == []
@@ -0,0 +1,40 @@
+import db
+
+
+def _add_anpr(plate, timestamp, camera_id=1):
+    db.get_event_writer().submit(db.ANPR_DB, db._insert_anpr_event,
+                                 1, plate, "v.jpg", "p.jpg", timestamp, camera_id)
+
+
+def _pages(limit, **filters):
+    ids, before = [], None
+    while True:
+        rows, before = db.query_anpr_events(before=before, limit=limit, **filters)
+        ids += [row[0] for row in rows]
+        if before is None:
+            return ids
+
+
+def test_cursor_is_stable_when_timestamps_tie(databases):
+    for i in range(5):
+        _add_anpr(f"MH12AB{i:04d}", "2025-01-01 10:00:00")
+    _add_anpr("MH12AB9999", "2025-01-01 09:00:00")
+    db.shutdown_event_writer()
+
+    assert _pages(limit=2) == [5, 4, 3, 2, 1, 6]
+
+    # a row arriving with the same timestamp mid-way is not repeated or skipped into later pages
+    rows, cursor = db.query_anpr_events(limit=2)
+    _add_anpr("MH12AB7777", "2025-01-01 10:00:00")
+    db.shutdown_event_writer()
+    rest, _ = db.query_anpr_events(before=cursor, limit=10)
+    assert [row[0] for row in rows + rest] == [5, 4, 3, 2, 1, 6]
+
+
+def test_negative_camera_filter(databases):
+    _add_anpr("MH12AB0001", "2025-01-01 10:00:00", camera_id=-1)
+    _add_anpr("MH12AB0002", "2025-01-01 10:00:00", camera_id=0)
+    db.shutdown_event_writer()
+
+    rows, _ = db.query_anpr_events(camera_id=-1)
+    assert [row[2] for row in rows] == ["MH12AB0001"]
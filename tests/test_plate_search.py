@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+import db
+from plate_search import search_plate_history
+
+PLATES = ["MH12AB1234", "MH12AB1235", "MH14CD5678", "KA01AB1234"]
+
+
+@pytest.fixture
+def sightings(databases):
+    for i, plate in enumerate(PLATES):
+        db.get_event_writer().submit(db.ANPR_DB, db._insert_anpr_event,
+                                     i, plate, f"v{i}.jpg", "p.jpg", f"2025-01-01 10:00:0{i}", 1)
+    db.shutdown_event_writer()
+    return databases
+
+
+def _plates(query, mode):
+    return sorted(row[0] for row in db.find_plates(query, mode, 50))
+
+
+def _index():
+    conn = sqlite3.connect(db.ANPR_DB)
+    plates = dict(conn.execute("SELECT plate_number, sightings FROM anpr_plates"))
+    fts = sorted(row[0] for row in conn.execute("SELECT plate_number FROM anpr_plates_fts"))
+    conn.close()
+    return plates, fts
+
+
+def test_prefix_uses_glob(sightings):
+    assert _plates("MH12", "prefix") == ["MH12AB1234", "MH12AB1235"]
+    assert _plates("AB12", "prefix") == []
+
+
+def test_substring_uses_trigram_index(sightings):
+    assert _plates("AB1234", "substring") == ["KA01AB1234", "MH12AB1234"]
+    assert _plates("CD56", "substring") == ["MH14CD5678"]
+
+
+def test_trigram_candidates_and_fuzzy_search(sightings):
+    assert "MH12AB1235" in _plates("MH12AB1239", "trigram")
+
+    plates, events, _ = search_plate_history("mh12-ab-1239", mode="fuzzy", max_distance=1)
+    assert [(row[0], row[4]) for row in plates] == [("MH12AB1234", 1), ("MH12AB1235", 1)]
+    assert sorted(row[2] for row in events) == ["MH12AB1234", "MH12AB1235"]
+
+
+def test_like_fallback(sightings, monkeypatch):
+    # queries shorter than a trigram cannot use the FTS index
+    assert _plates("14", "substring") == ["MH14CD5678"]
+
+    # SQLite without the trigram tokenizer
+    monkeypatch.setattr(db, "has_plate_fts", lambda cur: False)
+    assert _plates("AB1234", "substring") == ["KA01AB1234", "MH12AB1234"]
+
+
+def test_index_follows_correct_anpr_plate(sightings):
+    db.correct_anpr_plate(2, 1, "v2.jpg", "MH14CD5678", "MH14CD5679")
+    db.correct_anpr_plate(0, 1, "v0.jpg", "MH12AB1234", "MH12AB1235")
+    db.shutdown_event_writer()
+
+    plates, fts = _index()
+    assert plates == {"MH12AB1235": 2, "MH14CD5679": 1, "KA01AB1234": 1}
+    assert fts == sorted(plates)
+    assert _plates("CD5678", "substring") == []
+    assert _plates("CD5679", "substring") == ["MH14CD5679"]
+    assert _plates("MH12", "prefix") == ["MH12AB1235"]
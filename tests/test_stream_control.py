@@ -0,0 +1,69 @@
+import importlib
+
+import pytest
+
+
+class FakeWorker:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def start(self):
+        pass
+
+    def subscribe(self, profile):
+        yield from self.chunks
+
+
+@pytest.fixture
+def webapp(workdir):
+    # app.py initialises the databases on import; keep them in the test directory
+    return importlib.import_module("app")
+
+
+@pytest.fixture
+def client(webapp, monkeypatch):
+    monkeypatch.setattr(webapp, "_services_started", True)
+    monkeypatch.setattr(webapp, "CAMERAS", {1: {}, 2: {}})
+    monkeypatch.setattr(webapp, "paused_views", set())
+
+    def login():
+        client = webapp.app.test_client()
+        with client.session_transaction() as session:
+            session["user"] = "admin"
+        return client
+    return login
+
+
+def _viewer(client):
+    with client.session_transaction() as session:
+        return session["viewer"]
+
+
+def test_pause_is_per_viewer_and_camera(webapp, client):
+    alice, bob = client(), client()
+    alice.get("/pause?camera_id=1")
+    bob.get("/pause?camera_id=2")
+    assert webapp.paused_views == {(_viewer(alice), 1), (_viewer(bob), 2)}
+
+    alice.get("/play?camera_id=1")
+    bob.get("/live?camera_id=2")
+    assert webapp.paused_views == set()
+
+
+def test_paused_viewer_keeps_the_frame_others_move_on(webapp, client, monkeypatch):
+    monkeypatch.setattr(webapp, "get_worker", lambda *args: FakeWorker([b"1", b"2", b"3"]))
+    webapp.paused_views.add(("alice", 1))
+
+    assert list(webapp.gen_frames(1, viewer="alice")) == [b"1", b"1", b"1"]
+    assert list(webapp.gen_frames(1, viewer="bob")) == [b"1", b"2", b"3"]
+    assert list(webapp.gen_frames(2, viewer="alice")) == [b"1", b"2", b"3"]
+
+
+def test_resume_mid_stream(webapp, client, monkeypatch):
+    monkeypatch.setattr(webapp, "get_worker", lambda *args: FakeWorker([b"1", b"2", b"3", b"4"]))
+    webapp.paused_views.add(("alice", 1))
+
+    frames = webapp.gen_frames(1, viewer="alice")
+    assert [next(frames), next(frames)] == [b"1", b"1"]
+    webapp.paused_views.discard(("alice", 1))
+    assert list(frames) == [b"3", b"4"]
@@ -0,0 +1,19 @@
+import os
+
+import transcoder
+from transcoder import TranscodeService
+
+
+def test_recover_skips_the_segment_being_recorded(databases, monkeypatch):
+    folder = databases / "Live Feed"
+    folder.mkdir()
+    for name in ["live cam1 01.01.2025 - 10.00.00.mp4", "live cam1 01.01.2025 - 10.03.00.mp4"]:
+        (folder / name).write_bytes(b"\0" * 16)
+    os.utime(folder / "live cam1 01.01.2025 - 10.00.00.mp4", (1_700_000_000, 1_700_000_000))
+
+    queued = []
+    monkeypatch.setattr(transcoder, "needs_conversion", lambda path: True)
+    monkeypatch.setattr(transcoder, "enqueue_segment", lambda path: queued.append(path.name))
+
+    TranscodeService(str(folder))._recover()
+    assert queued == ["live cam1 01.01.2025 - 10.00.00.mp4"]
@@ -0,0 +1,74 @@
+import pytest
+
+import db
+from watchlist import WatchlistIndex
+
+WATCHLIST = ["MH12AB1234", "KA05MN0987", "DL3CAF0001"]
+
+
+@pytest.fixture
+def index(databases):
+    for plate in WATCHLIST:
+        db.add_watchlist_plate(plate, "stolen")
+    index = WatchlistIndex()
+    index.load()
+    return index
+
+
+@pytest.mark.parametrize("plate, expected", [
+    ("MH12AB1234", ("MH12AB1234", "exact", 0)),
+    ("MH12A81234", ("MH12AB1234", "confusion", 0)),     # B read as 8
+    ("KAO5MN0987", ("KA05MN0987", "confusion", 0)),     # 0 read as O
+    ("DL3CAFOOO1", ("DL3CAF0001", "confusion", 0)),
+    ("MH12AB1235", ("MH12AB1234", "fuzzy", 1)),         # substitution
+    ("MH12AB234", ("MH12AB1234", "fuzzy", 1)),          # dropped character
+    ("KA05MN09877", ("KA05MN0987", "fuzzy", 1)),        # extra character
+    ("MH12A8I235", ("MH12AB1234", "fuzzy", 1)),         # confusions plus one edit
+    ("MH12AB1299", None),                               # two edits
+    ("TN09ZZ4444", None),
+])
+def test_match(index, plate, expected):
+    assert index.match(plate) == expected
+
+
+def test_fuzzy_can_be_disabled(databases):
+    db.add_watchlist_plate("MH12AB1234")
+    index = WatchlistIndex(max_distance=0)
+    index.load()
+    assert index.match("MH12A81234") == ("MH12AB1234", "confusion", 0)
+    assert index.match("MH12AB1235") is None
+
+
+def test_refresh_applies_the_change_log(index):
+    db.remove_watchlist_plate("MH12AB1234")
+    db.add_watchlist_plate("KA05MN0987", "recovered")
+    db.add_watchlist_plate("GJ01XY2222", "expired permit")
+    index.refresh()
+
+    assert len(index) == 3
+    assert index.match("MH12AB1234") is None
+    assert index.match("MH12AB1235") is None
+    assert index.entries["KA05MN0987"] == "recovered"
+    assert index.match("GJ01XY2223") == ("GJ01XY2222", "fuzzy", 1)
+
+    # nothing of the removed plate is left in the folded or bigram indexes
+    assert "MH12A81234" not in index.by_folded
+    assert all("MH12A81234" not in plates for plates in index.by_bigram.values())
+
+    # a fresh load sees the same watchlist and continues from the same change seq
+    reloaded = WatchlistIndex()
+    reloaded.load()
+    assert reloaded.entries == index.entries
+    assert reloaded.seq == index.seq
+
+
+def test_removing_one_of_two_confusable_plates(databases):
+    db.add_watchlist_plate("MH12AB1234")
+    db.add_watchlist_plate("MH12A81234")        # folds to the same text
+    index = WatchlistIndex()
+    index.load()
+
+    db.remove_watchlist_plate("MH12AB1234")
+    index.refresh()
+    assert index.match("MH12AB1234") == ("MH12A81234", "confusion", 0)
+    assert index.match("MH12AB1235") == ("MH12A81234", "fuzzy", 1)
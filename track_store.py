@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+# ---------------- Track-state store ----------------
+# Per-track state is kept only while the track is alive: records not
+# seen for TRACK_TTL_FRAMES frames are evicted, and the store never
+# holds more than MAX_TRACKS records (least recently seen go first),
+# so memory stays flat however long a camera runs.
+TRACK_TTL_FRAMES = 150   # ~30 s at 5 fps, well past the tracker's own lost-track buffer
+MAX_TRACKS = 1000
+
+
+class AnprTrack:
+    __slots__ = ("last_seen", "reads", "plate", "reread", "vehicle_image", "plate_box", "quality",
+                 "watch_hit")
+
+    def __init__(self):
+        self.last_seen = 0
+        self.reads = []          # first MAX_FRAMES OCR results
+        self.plate = None        # frozen plate
+        self.reread = None       # re-read disagreeing with the frozen plate, awaiting a second one
+        self.vehicle_image = None   # evidence path once the event is written; identifies its row
+        self.plate_box = None    # plate box relative to the vehicle box
+        self.quality = 0.0       # quality of the crop the plate was read from
+        self.watch_hit = None    # watchlist match of the frozen plate
+
+
+class PpeTrack:
+    __slots__ = ("last_seen", "image", "violations", "boxes")
+
+    def __init__(self):
+        self.last_seen = 0
+        self.image = None        # evidence path of the person image
+        self.violations = set()  # violations already sent to the DB
+        self.boxes = []          # last frame's (violation, box relative to the person)
+
+
+class TrackStore:
+    """Track records keyed by track ID, ordered by last-seen frame."""
+
+    def __init__(self, record_type, ttl_frames=TRACK_TTL_FRAMES, max_tracks=MAX_TRACKS):
+        self.record_type = record_type
+        self.ttl_frames = ttl_frames
+        self.max_tracks = max_tracks
+        self._records = OrderedDict()
+        self.frame_index = 0
+        self.evicted = 0
+
+    def tick(self):
+        """Advances one frame and evicts tracks that have expired."""
+        self.frame_index += 1
+        oldest_allowed = self.frame_index - self.ttl_frames
+
+        while self._records:
+            tid, record = next(iter(self._records.items()))
+            if record.last_seen >= oldest_allowed:
+                break
+            del self._records[tid]
+            self.evicted += 1
+
+    def touch(self, tid):
+        """Returns the record of `tid` (creating it) and marks it seen this frame."""
+        record = self._records.get(tid)
+        if record is None:
+            record = self.record_type()
+            self._records[tid] = record
+            if len(self._records) > self.max_tracks:
+                self._records.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._records.move_to_end(tid)
+
+        record.last_seen = self.frame_index
+        return record
+
+    def get(self, tid):
+        return self._records.get(tid)
+
+    def __contains__(self, tid):
+        return tid in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def stats(self):
+        return {"live_tracks": len(self._records), "evicted_tracks": self.evicted}
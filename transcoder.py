@@ -0,0 +1,155 @@
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from db import (enqueue_transcode_job, claim_transcode_jobs, finish_transcode_job,
+                requeue_stale_transcode_jobs, TIMESTAMP_FORMAT)
+from Videoconverter import check_ffmpeg, convert_segment, needs_conversion
+from recorder import LIVE_FEED_FOLDER, RECORDING_IDLE_SECONDS
+
+# ---------------- Background transcoding ----------------
+# Recorders report each finished segment; ones that still need
+# converting are queued in transcode_jobs, and this
+# service converts them on a bounded process pool and keeps a
+# manifest of playable files, so /videos never runs ffmpeg itself.
+TRANSCODE_WORKERS = int(os.environ.get("TRANSCODE_WORKERS", 1))
+POLL_SECONDS = 5.0
+STALE_JOB_SECONDS = 3600    # 'running' jobs older than this were orphaned by a crash
+MANIFEST_FILE = os.path.join(LIVE_FEED_FOLDER, "manifest.json")
+
+
+def enqueue_segment(path):
+    enqueue_transcode_job(os.path.abspath(path))
+
+
+def segment_closed(path):
+    """
+    Recorder callback: mp4v segments are queued for conversion,
+    browser-ready ones are published in the manifest right away.
+    """
+    if needs_conversion(path):
+        enqueue_segment(path)
+    else:
+        write_manifest(os.path.dirname(path))
+
+
+def _run_job(source):
+    output = convert_segment(source)
+    return os.path.basename(output) if output else None
+
+
+def write_manifest(folder=LIVE_FEED_FOLDER):
+    videos = sorted(
+        (f for f in os.listdir(folder) if f.lower().endswith('c.mp4')),
+        key=lambda f: os.path.getmtime(os.path.join(folder, f)),
+        reverse=True
+    )
+    # camera processes and the service may rewrite it concurrently
+    tmp_path = f"{MANIFEST_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"videos": videos}, f)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+_manifest_cache = (None, [])
+
+def read_manifest():
+    """Converted videos, newest first; re-read only when the file changes."""
+    global _manifest_cache
+    try:
+        mtime = os.path.getmtime(MANIFEST_FILE)
+    except OSError:
+        return []
+
+    if _manifest_cache[0] != mtime:
+        with open(MANIFEST_FILE) as f:
+            _manifest_cache = (mtime, json.load(f)["videos"])
+    return _manifest_cache[1]
+
+
+class TranscodeService(threading.Thread):
+    def __init__(self, folder=LIVE_FEED_FOLDER, workers=TRANSCODE_WORKERS):
+        super().__init__(name="transcoder", daemon=True)
+        self.folder = folder
+        self.workers = workers
+        self.executor = None
+        self.running_jobs = {}      # future -> job id
+        self.wake = threading.Event()
+        self.stopped = False
+
+    def enqueue(self, path):
+        enqueue_segment(path)
+        self.wake.set()
+
+    def _recover(self):
+        stale = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+        requeue_stale_transcode_jobs(stale.strftime(TIMESTAMP_FORMAT))
+
+        # segments recorded while no service was running; a file still
+        # being written is queued by segment_closed once the recorder closes it
+        recording = time.time() - RECORDING_IDLE_SECONDS
+        for path in Path(self.folder).iterdir():
+            if path.is_file() and path.stat().st_mtime < recording and needs_conversion(path):
+                enqueue_segment(path)
+
+    def run(self):
+        os.makedirs(self.folder, exist_ok=True)
+        write_manifest(self.folder)
+
+        if not check_ffmpeg():
+            return   # jobs stay queued until a server with ffmpeg picks them up
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=mp.get_context("spawn")
+        )
+        self._recover()
+
+        while not self.stopped:
+            free = self.workers - len(self.running_jobs)
+            if free > 0:
+                for job_id, source in claim_transcode_jobs(free):
+                    try:
+                        future = self.executor.submit(_run_job, source)
+                    except RuntimeError:
+                        return   # interpreter exiting; the job is requeued as stale
+                    self.running_jobs[future] = job_id
+
+            finished = [f for f in self.running_jobs if f.done()]
+            for future in finished:
+                job_id = self.running_jobs.pop(future)
+                try:
+                    output = future.result()
+                    finish_transcode_job(job_id, output, None if output else "ffmpeg failed")
+                except Exception as e:
+                    finish_transcode_job(job_id, None, str(e))
+
+            if finished:
+                write_manifest(self.folder)
+
+            self.wake.wait(1.0 if self.running_jobs else POLL_SECONDS)
+            self.wake.clear()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def start_transcode_service():
+    global _service
+    if mp.parent_process() is not None:
+        return None   # spawned children re-import app.py; only the server runs the service
+    with _service_lock:     # concurrent first requests start one service
+        if _service is None:
+            _service = TranscodeService()
+            _service.start()
+    return _service
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import defaultdict
+
+from db import get_watchlist, get_watchlist_changes, insert_watchlist_alert
+from functions import within_distance
+
+# ---------------- Watchlist matching ----------------
+# Plates are matched three ways, cheapest first:
+#   exact     - dict lookup on the plate text
+#   confusion - dict lookup after folding characters OCR mixes up (0/O, 8/B, ...)
+#   fuzzy     - edit distance <= MAX_DISTANCE on the folded text, with
+#               candidates taken from a bigram inverted index
+MAX_DISTANCE = 1
+REFRESH_SECONDS = 2.0    # how often the watchlist table is polled for changes
+
+CONFUSIONS = str.maketrans({
+    "O": "0", "Q": "0", "D": "0",
+    "I": "1", "L": "1",
+    "Z": "2",
+    "S": "5",
+    "G": "6",
+    "T": "7",
+    "B": "8",
+})
+
+
+def fold(plate):
+    return plate.upper().translate(CONFUSIONS)
+
+
+def bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class WatchlistIndex:
+    """In-memory index over the watchlist table."""
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.entries = {}                       # plate -> reason
+        self.by_folded = defaultdict(set)       # folded plate -> plates
+        self.by_bigram = defaultdict(set)       # bigram of folded plate -> folded plates
+        self.seq = 0
+        self.last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    # ---------------- Loading ----------------
+    def load(self):
+        rows, seq = get_watchlist()
+        with self._lock:
+            self.entries.clear()
+            self.by_folded.clear()
+            self.by_bigram.clear()
+            for plate, reason, _ in rows:
+                self._add(plate, reason)
+            self.seq = seq
+        self.last_refresh = time.time()
+
+    def refresh(self):
+        """Applies watchlist changes logged since the last load/refresh."""
+        changes = get_watchlist_changes(self.seq)
+        with self._lock:
+            for seq, op, plate, reason in changes:
+                if op == "add":
+                    self._add(plate, reason)
+                else:
+                    self._remove(plate)
+                self.seq = seq
+        self.last_refresh = time.time()
+
+    def maybe_refresh(self):
+        if time.time() - self.last_refresh >= REFRESH_SECONDS:
+            self.refresh()
+
+    def _add(self, plate, reason):
+        self.entries[plate] = reason or ""
+        folded = fold(plate)
+        self.by_folded[folded].add(plate)
+        for gram in bigrams(folded):
+            self.by_bigram[gram].add(folded)
+
+    def _remove(self, plate):
+        if self.entries.pop(plate, None) is None:
+            return
+        folded = fold(plate)
+        self.by_folded[folded].discard(plate)
+        if self.by_folded[folded]:
+            return
+        del self.by_folded[folded]
+        for gram in bigrams(folded):
+            self.by_bigram[gram].discard(folded)
+            if not self.by_bigram[gram]:
+                del self.by_bigram[gram]
+
+    # ---------------- Matching ----------------
+    def match(self, plate):
+        """Returns (watch_plate, match_type, distance) or None."""
+        with self._lock:
+            if plate in self.entries:
+                return (plate, "exact", 0)
+
+            folded = fold(plate)
+            if folded in self.by_folded:
+                return (min(self.by_folded[folded]), "confusion", 0)
+
+            if not self.max_distance:
+                return None
+
+            # q-gram lemma: an edit touches at most 2 bigrams
+            grams = bigrams(folded)
+            needed = len(grams) - 2 * self.max_distance
+            counts = defaultdict(int)
+            for gram in grams:
+                for candidate in self.by_bigram.get(gram, ()):
+                    counts[candidate] += 1
+
+            best = None
+            for candidate, shared in counts.items():
+                if shared < needed:
+                    continue
+                distance = within_distance(folded, candidate, self.max_distance)
+                if distance is not None and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+
+            if best is None:
+                return None
+            return (min(self.by_folded[best[0]]), "fuzzy", best[1])
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# ---------------- Alerts ----------------
+_index = None
+alerts_raised = 0
+
+def get_watchlist_index():
+    global _index
+    if _index is None:
+        _index = WatchlistIndex()
+        _index.load()
+    return _index
+
+def check_plate(plate, track_id, camera_id, previous=None):
+    """
+    Called whenever ANPR freezes (or corrects) a plate. Returns the
+    match tuple and records an alert if the plate is on the watchlist,
+    unless `previous`, the track's earlier match, was already for the
+    same watchlist entry.
+    """
+    global alerts_raised
+    index = get_watchlist_index()
+    index.maybe_refresh()
+
+    hit = index.match(plate)
+    if hit is None or (previous is not None and previous[0] == hit[0]):
+        return hit
+
+    watch_plate, match_type, distance = hit
+    insert_watchlist_alert(plate, watch_plate, match_type, distance, track_id, camera_id)
+    alerts_raised += 1
+    return hit
+
+def get_watchlist_stats():
+    index = get_watchlist_index()
+    return {"watchlist_size": len(index), "watchlist_alerts": alerts_raised}